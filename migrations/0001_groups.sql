@@ -0,0 +1,30 @@
+-- Tables the sync writes to. Safe to run against an existing database.
+
+create table if not exists public.groups (
+  id                bigserial primary key,
+  pco_group_id      text not null unique,
+  name              text not null,
+  description       text,
+  campus            text,
+  days_of_week      text[],
+  time_of_day       text,
+  stage_of_life     text,
+  group_type        text,
+  is_open           boolean default true,
+  max_size          integer,
+  current_size      integer,
+  church_center_url text,
+  tags              jsonb,
+  row_hash          text,
+  updated_at        timestamptz default now()
+);
+
+-- Tables created before row hashing was added.
+alter table public.groups add column if not exists row_hash text;
+
+-- Watermark for --incremental runs.
+create table if not exists public.sync_state (
+  key        text primary key,
+  value      text,
+  updated_at timestamptz default now()
+);
@@ -0,0 +1,67 @@
+-- sync_groups(rows, keep_ids): apply one sync run in a single transaction.
+--
+-- `rows` is a JSON array of groups rows (as built by sync_groups.py), upserted
+-- on pco_group_id; if a group appears twice the last one wins. When
+-- `keep_ids` is given, every row whose pco_group_id isn't in it is deleted in
+-- the same transaction. Returns {"upserted": n, "deleted": n}.
+
+create or replace function public.sync_groups(rows jsonb, keep_ids text[] default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+  upserted integer;
+  deleted integer := 0;
+begin
+  insert into public.groups (
+    pco_group_id, name, description, campus, days_of_week, time_of_day,
+    stage_of_life, group_type, is_open, max_size, current_size,
+    church_center_url, tags, row_hash
+  )
+  select distinct on (g.pco_group_id)
+    g.pco_group_id, g.name, g.description, g.campus, g.days_of_week, g.time_of_day,
+    g.stage_of_life, g.group_type, g.is_open, g.max_size, g.current_size,
+    g.church_center_url, g.tags, g.row_hash
+  from jsonb_array_elements(coalesce(rows, '[]'::jsonb)) with ordinality as r(item, n)
+  cross join lateral jsonb_populate_record(null::public.groups, r.item) as g
+  order by g.pco_group_id, r.n desc
+  on conflict (pco_group_id) do update set
+    name = excluded.name,
+    description = excluded.description,
+    campus = excluded.campus,
+    days_of_week = excluded.days_of_week,
+    time_of_day = excluded.time_of_day,
+    stage_of_life = excluded.stage_of_life,
+    group_type = excluded.group_type,
+    is_open = excluded.is_open,
+    max_size = excluded.max_size,
+    current_size = excluded.current_size,
+    church_center_url = excluded.church_center_url,
+    tags = excluded.tags,
+    row_hash = excluded.row_hash;
+  get diagnostics upserted = row_count;
+
+  if keep_ids is not null then
+    delete from public.groups where not (pco_group_id = any (keep_ids));
+    get diagnostics deleted = row_count;
+  end if;
+
+  return jsonb_build_object('upserted', upserted, 'deleted', deleted);
+end;
+$$;
+
+-- Only the sync (service role) may call it; Supabase grants new functions in
+-- public to anon and authenticated by default.
+revoke execute on function public.sync_groups(jsonb, text[]) from public;
+do $$
+begin
+  if exists (select 1 from pg_roles where rolname = 'anon') then
+    revoke execute on function public.sync_groups(jsonb, text[]) from anon, authenticated;
+  end if;
+  if exists (select 1 from pg_roles where rolname = 'service_role') then
+    grant execute on function public.sync_groups(jsonb, text[]) to service_role;
+  end if;
+end
+$$;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,57 @@
+-- Soft deletes: groups that disappear from PCO get deleted_at set instead of
+-- being deleted. 0005 hides them from readers; the sync's
+-- --purge-tombstones DAYS hard-deletes old tombstones.
+
+alter table public.groups add column if not exists deleted_at timestamptz;
+
+-- sync_groups() now tombstones groups missing from keep_ids (leaving existing
+-- tombstones alone) and clears deleted_at on any group it upserts.
+-- "deleted" in the result counts newly tombstoned groups.
+create or replace function public.sync_groups(rows jsonb, keep_ids text[] default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+  upserted integer;
+  deleted integer := 0;
+begin
+  insert into public.groups (
+    pco_group_id, name, description, campus, days_of_week, time_of_day,
+    stage_of_life, group_type, is_open, max_size, current_size,
+    church_center_url, tags, row_hash, deleted_at
+  )
+  select distinct on (g.pco_group_id)
+    g.pco_group_id, g.name, g.description, g.campus, g.days_of_week, g.time_of_day,
+    g.stage_of_life, g.group_type, g.is_open, g.max_size, g.current_size,
+    g.church_center_url, g.tags, g.row_hash, null
+  from jsonb_array_elements(coalesce(rows, '[]'::jsonb)) with ordinality as r(item, n)
+  cross join lateral jsonb_populate_record(null::public.groups, r.item) as g
+  order by g.pco_group_id, r.n desc
+  on conflict (pco_group_id) do update set
+    name = excluded.name,
+    description = excluded.description,
+    campus = excluded.campus,
+    days_of_week = excluded.days_of_week,
+    time_of_day = excluded.time_of_day,
+    stage_of_life = excluded.stage_of_life,
+    group_type = excluded.group_type,
+    is_open = excluded.is_open,
+    max_size = excluded.max_size,
+    current_size = excluded.current_size,
+    church_center_url = excluded.church_center_url,
+    tags = excluded.tags,
+    row_hash = excluded.row_hash,
+    deleted_at = null;
+  get diagnostics upserted = row_count;
+
+  if keep_ids is not null then
+    update public.groups set deleted_at = now()
+    where deleted_at is null and not (pco_group_id = any (keep_ids));
+    get diagnostics deleted = row_count;
+  end if;
+
+  return jsonb_build_object('upserted', upserted, 'deleted', deleted);
+end;
+$$;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,23 @@
+-- Indexes for the Church Center finder, which filters live groups on campus,
+-- days_of_week, stage_of_life, group_type and is_open.
+--
+-- Names follow Postgres' own <table>_<columns>_idx scheme. --swap rebuilds
+-- every index on its shadow table after loading it and renames them back to
+-- these names when it swaps the table in.
+
+create index if not exists groups_campus_idx on public.groups (campus);
+create index if not exists groups_stage_of_life_idx on public.groups (stage_of_life);
+create index if not exists groups_group_type_idx on public.groups (group_type);
+
+-- Array containment / overlap: days_of_week @> '{Tuesday}', && '{...}'.
+create index if not exists groups_days_of_week_idx on public.groups using gin (days_of_week);
+-- jsonb containment and key lookups on tags.
+create index if not exists groups_tags_idx on public.groups using gin (tags);
+
+-- is_open alone is too unselective for a btree to help; the finder only ever
+-- lists open, live groups, so index just those on the usual filters.
+create index if not exists groups_campus_stage_of_life_group_type_idx
+  on public.groups (campus, stage_of_life, group_type)
+  where is_open and deleted_at is null;
+
+analyze public.groups;
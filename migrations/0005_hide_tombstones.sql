@@ -0,0 +1,33 @@
+-- Keep tombstoned groups (deleted_at set, see 0003) away from readers.
+--
+-- Readers reach public.groups through PostgREST as anon / authenticated,
+-- which row level security applies to; the sync's service_role (and the
+-- table owner) bypass it and still see every row. This only ever narrows
+-- access:
+--
+-- * RLS off: every grantee could read every row, so RLS is turned on with
+--   one policy letting them read live groups.
+-- * RLS already on: the existing policies decide who reads what, and a
+--   restrictive policy ANDs `deleted_at is null` onto them.
+--
+-- Policies are not views, so --swap carries them over to the new table.
+
+do $$
+begin
+  if exists (select 1 from pg_policies where schemaname = 'public' and tablename = 'groups'
+             and policyname in ('groups_read_live', 'groups_hide_tombstones')) then
+    return;
+  end if;
+
+  if (select relrowsecurity from pg_class where oid = 'public.groups'::regclass) then
+    create policy groups_hide_tombstones on public.groups
+      as restrictive for select to public using (deleted_at is null);
+  else
+    alter table public.groups enable row level security;
+    create policy groups_read_live on public.groups
+      for select to public using (deleted_at is null);
+  end if;
+end
+$$;
+
+notify pgrst, 'reload schema';
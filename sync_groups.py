@@ -1,53 +1,136 @@
 import os
+import argparse
 import base64
-from typing import List, Dict, Any, Tuple
+import gzip
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    ALL_COMPLETED, FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from email.utils import parsedate_to_datetime
+from itertools import chain, islice
+from typing import (
+    TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple,
+    TypeVar,
+)
 
 import requests
-from supabase import create_client, Client
+from requests.adapters import HTTPAdapter
+
+# supabase (and the postgrest/httpx stack under it) takes longer to import
+# than everything else here put together, so it's only imported once a
+# Supabase client is actually needed; see get_supabase().
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Optional faster JSON decoders; the stdlib is used when neither is installed.
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 """
 Sync Planning Center Online Groups -> Supabase `groups` table.
 
-Env vars required (set via GitHub Actions secrets or local env):
+Env vars required (set via GitHub Actions secrets or local env); each is
+only read when the client that needs it is first used, so --dry-run works
+without the Supabase ones:
 - PCO_APP_ID
 - PCO_SECRET
 - SUPABASE_URL
 - SUPABASE_SERVICE_KEY
+- SUPABASE_DB_URL (only for --copy/--swap/migrate: the Postgres connection
+  string)
+
+The database schema (public.groups, public.sync_state, the sync_groups()
+function used by --rpc and the finder's indexes) lives in versioned SQL files
+under migrations/; apply any that are new with:
+
+    python sync_groups.py migrate
 
-Supabase table expected (public.groups):
-
-create table if not exists public.groups (
-  id                bigserial primary key,
-  pco_group_id      text not null unique,
-  name              text not null,
-  description       text,
-  campus            text,
-  days_of_week      text[],
-  time_of_day       text,
-  stage_of_life     text,
-  group_type        text,
-  is_open           boolean default true,
-  max_size          integer,
-  current_size      integer,
-  church_center_url text,
-  tags              jsonb,
-  updated_at        timestamptz default now()
-);
+The scheduled workflow runs that before every sync. When rolling this out to
+a project set up before migrations existed:
+
+1. Add the SUPABASE_DB_URL secret to the repository (the sync's migrate step
+   fails without it, and the sync doesn't run).
+2. Optionally run `python sync_groups.py migrate` by hand first, to see the
+   schema change land outside a scheduled run.
+3. The first sync after that has no watermark and no stored row hashes, so it
+   is a full sync that rewrites every row once; later runs only write changes.
+
+`row_hash` is a sha256 of the rest of the row; rows whose hash hasn't changed
+since the last sync aren't sent again. Groups that disappear from PCO get
+`deleted_at` set instead of being deleted; a row level security policy
+(migrations/0005) hides them from PostgREST readers. Incremental runs
+(--incremental) keep their watermark in public.sync_state.
 """
 
 # --- Config from environment ---
 
-PCO_APP_ID = os.environ["PCO_APP_ID"]
-PCO_SECRET = os.environ["PCO_SECRET"]
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_SERVICE_KEY = os.environ["SUPABASE_SERVICE_KEY"]
+def required_env(name: str) -> str:
+    value = os.environ.get(name)
+    if not value:
+        raise RuntimeError(f"Missing required environment variable {name}")
+    return value
+
+# Max pooled keep-alive connections to PCO.
+PCO_POOL_SIZE = int(os.environ.get("PCO_POOL_SIZE", "10"))
+
+# PCO's documented default is 100 requests per 20 seconds; the client retunes
+# itself from the X-PCO-API-Request-Rate-* headers on every response.
+PCO_RATE_LIMIT = 100
+PCO_RATE_PERIOD = 20.0
+
+# How many times one request may hit a 429 before we give up on it.
+RATE_LIMIT_ATTEMPTS = 5
+
+# On-disk HTTP cache for conditional PCO requests (disable with --no-cache).
+PCO_CACHE_DIR = os.environ.get("PCO_CACHE_DIR", ".pco_cache")
+PCO_CACHE_MAX_BYTES = int(os.environ.get("PCO_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Seconds before a PCO request is abandoned (and retried).
+PCO_TIMEOUT = float(os.environ.get("PCO_TIMEOUT", "30"))
+
+# Shared retry policy for every PCO and Supabase call: tries per call,
+# backoff bounds in seconds, and total retries allowed across the whole run.
+RETRY_ATTEMPTS = int(os.environ.get("SYNC_RETRY_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+RETRY_BUDGET = int(os.environ.get("SYNC_RETRY_BUDGET", "50"))
+
+
+@lru_cache(maxsize=None)
+def get_supabase() -> "Client":
+    """The shared Supabase client, created on first use."""
+    from supabase import create_client
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    return create_client(required_env("SUPABASE_URL"), required_env("SUPABASE_SERVICE_KEY"))
 
 # If your old Pipedream script used a more specific endpoint (like a group_type),
 # you can swap this BASE_URL to match that.
 BASE_URL = "https://api.planningcenteronline.com/groups/v2/groups"
 
+# PCO caps per_page at 100.
+PER_PAGE = 100
+
+# Explicit sort for paging. Offsets are only stable if every request sees the
+# same order, and with created_at new groups land at the end instead of
+# shifting later pages (see also RowDiff.filter, which drops repeats).
+PAGE_ORDER = "created_at"
+
+T = TypeVar("T")
+
 
 # --- Helpers ---------------------------------------------------------------
 
@@ -56,142 +139,906 @@ def basic_auth_header(app_id: str, secret: str) -> str:
     return f"Basic {token}"
 
 
-def fetch_all_groups() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    """Fetch all groups from PCO with pagination.
+def retry_after_seconds(value: Optional[str], default: float) -> float:
+    """Parse a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+# Postgres SQLSTATEs (and HTTP statuses surfaced through postgrest-py's
+# APIError.code) that are worth another try.
+RETRYABLE_PG_CODES = {"40001", "40P01", "55P03", "57014", "57P01", "53300"}
+RETRYABLE_HTTP_STATUSES = {500, 502, 503, 504}
+
 
-    Returns (all_groups_data, all_included_resources).
-    We ignore `included` now since we're not using tags, but keep the
-    return shape in case you want it later.
+def is_retryable(exc: BaseException, idempotent: bool = True) -> bool:
+    """True if `exc` looks transient: a dropped connection, timeout or 5xx.
+
+    A request that isn't safe to repeat (a plain insert) is only retried when
+    it can't have taken effect: the connection was never made, or Postgres
+    says it rolled the statement back. A timeout, reset or 5xx may have come
+    after the commit, and the retry would then fail on the rows it wrote.
     """
-    headers = {
-        "Authorization": basic_auth_header(PCO_APP_ID, PCO_SECRET),
-        "Content-Type": "application/json",
-    }
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return idempotent or isinstance(exc, requests.ConnectTimeout)
+    if isinstance(exc, requests.HTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        return idempotent and status in RETRYABLE_HTTP_STATUSES
+    # httpx/postgrest errors can only come from a Supabase client, which has
+    # imported them already; don't pull them in just to rule them out.
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return idempotent or isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+    postgrest = sys.modules.get("postgrest.exceptions")
+    if postgrest is not None and isinstance(exc, postgrest.APIError):
+        code = str(exc.code or "")
+        if code in RETRYABLE_PG_CODES:
+            return True
+        return idempotent and (
+            code.startswith("08")  # connection exceptions
+            or (code.isdigit() and int(code) in RETRYABLE_HTTP_STATUSES)
+        )
+    return False
 
-    all_data: List[Dict[str, Any]] = []
-    all_included: List[Dict[str, Any]] = []
 
-    url = BASE_URL
-    # We can drop include=tags since we don't need them anymore
-    params = {"per_page": 100}
+class RetryPolicy:
+    """Jittered exponential backoff for transient failures.
 
-    page = 0
-    while url:
-        page += 1
-        print(f"Requesting page {page}: {url}")
+    Each call gets up to `attempts` tries, and the whole run shares a
+    `budget` of retries so a real outage fails fast instead of backing off
+    on every request.
+    """
 
-        # Only send params on first request. `links.next` has its own query string.
-        if page == 1:
-            resp = requests.get(url, headers=headers, params=params)
-        else:
-            resp = requests.get(url, headers=headers)
+    def __init__(
+        self,
+        attempts: int = RETRY_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        budget: int = RETRY_BUDGET,
+    ):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.lock = threading.Lock()
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _take_budget(self) -> bool:
+        with self.lock:
+            if self.budget <= 0:
+                return False
+            self.budget -= 1
+            return True
+
+    def call(self, fn: Callable[[], T], what: str, idempotent: bool = True) -> T:
+        attempt = 1
+        while True:
+            try:
+                return fn()
+            except Exception as exc:
+                if (attempt >= self.attempts or not is_retryable(exc, idempotent)
+                        or not self._take_budget()):
+                    raise
+                delay = self.backoff(attempt)
+                print(f"  {what} failed ({exc!r}); retry {attempt}/{self.attempts - 1} in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+
+retry_policy = RetryPolicy()
+
+
+def execute_with_retry(query: Any, what: str = "Supabase request", idempotent: bool = True) -> Any:
+    """Run a supabase-py query builder's `.execute()` under the retry policy.
+
+    Pass `idempotent=False` for writes that can't safely run twice (see
+    is_retryable).
+    """
+    return retry_policy.call(query.execute, what, idempotent)
+
+
+class RateLimiter:
+    """Thread-safe sliding window: at most `limit` requests in any `period` seconds.
+
+    Use it as a context manager around each request. A request counts against
+    the window from the moment it starts until `period` seconds after it
+    finished, so even with varying latency PCO never sees more than `limit`
+    arrivals in one window. Unlike a token bucket this can't let through a
+    full burst on top of a steady rate.
+
+    PCO reports its limit on every response, so `configure()` is called with
+    those values as they come in, and `observe()` with its count of requests
+    in the current window: requests this process didn't make (another job
+    using the same app) are assumed to have just happened. `pause()` blocks
+    every caller until a Retry-After has passed.
+    """
+
+    def __init__(self, limit: int, period: float):
+        self.condition = threading.Condition()
+        self.limit = limit
+        self.period = period
+        self.finished: Deque[float] = deque()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+
+    def configure(self, limit: int, period: float) -> None:
+        with self.condition:
+            self.limit = limit
+            self.period = period
+            self.condition.notify_all()
+
+    def observe(self, count: int) -> None:
+        with self.condition:
+            now = time.monotonic()
+            self._expire(now)
+            unseen = count - len(self.finished) - self.in_flight
+            if unseen > 0:
+                self.finished.extend([now] * unseen)
+
+    def pause(self, seconds: float) -> None:
+        with self.condition:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def __enter__(self) -> "RateLimiter":
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if now < self.blocked_until:
+                    wait_for: Optional[float] = self.blocked_until - now
+                else:
+                    excess = len(self.finished) + self.in_flight - self.limit
+                    if excess < 0:
+                        self.in_flight += 1
+                        return self
+                    # Wait for enough finished requests to age out of the
+                    # window, or (if those are all in flight) for one to end.
+                    wait_for = (
+                        self.finished[excess] + self.period - now
+                        if excess < len(self.finished) else None
+                    )
+                self.condition.wait(wait_for)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            self.finished.append(time.monotonic())
+            self.condition.notify()
+
+    def _expire(self, now: float) -> None:
+        while self.finished and self.finished[0] <= now - self.period:
+            self.finished.popleft()
+
+
+class ResponseCache:
+    """On-disk cache of PCO responses for conditional GETs.
+
+    Entries are keyed by the full request URL and hold the body along with
+    its ETag / Last-Modified, so the next run can send If-None-Match /
+    If-Modified-Since and reuse the stored body on a 304. Files are touched
+    on every hit, and the least recently used ones are deleted whenever the
+    cache grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: str = PCO_CACHE_DIR, max_bytes: int = PCO_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.bytes_saved = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _path, size, _mtime in self._entries())
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
 
+    def load(self, url: str) -> Optional[Tuple[Dict[str, str], bytes]]:
+        """Return (validators, body) for `url`, or None if it isn't cached."""
+        try:
+            with open(self._path(url), "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def conditional_headers(self, meta: Dict[str, str]) -> Dict[str, str]:
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def hit(self, url: str, body: bytes) -> None:
+        """Record a 304 and mark the entry as recently used."""
+        try:
+            os.utime(self._path(url))
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+            self.bytes_saved += len(body)
+
+    def store(self, url: str, resp: requests.Response) -> None:
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta = json.dumps({"url": url, "etag": etag, "last_modified": last_modified})
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(meta.encode("utf-8") + b"\n")
+            f.write(resp.content)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total_bytes += os.path.getsize(path) - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Oldest mtime first; called with the lock held.
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        self.total_bytes = sum(size for _path, size, _mtime in entries)
+        for path, size, _mtime in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_bytes -= size
+
+
+class PCOClient:
+    """Thin wrapper around a pooled `requests.Session` for PCO API calls.
+
+    All PCO requests should go through one of these so they reuse the same
+    keep-alive connections instead of paying a TCP+TLS handshake per page.
+    Requests are paced by a sliding-window limiter tuned from PCO's rate-limit headers,
+    and a 429 pauses every thread for the Retry-After the API asks for.
+    When `cache` is set, `get_content()` makes conditional requests against it.
+    """
+
+    def __init__(self, app_id: str, secret: str, pool_size: int = PCO_POOL_SIZE):
+        self.session = requests.Session()
+        self.pool_size = 0
+        self.ensure_pool_size(pool_size)
+        self.session.headers.update({
+            "Authorization": basic_auth_header(app_id, secret),
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        self.limiter = RateLimiter(PCO_RATE_LIMIT, PCO_RATE_PERIOD)
+        self.cache: Optional[ResponseCache] = None
+
+    def ensure_pool_size(self, pool_size: int) -> None:
+        """Grow the connection pool so `pool_size` threads can each hold one."""
+        if pool_size <= self.pool_size:
+            return
+        old_adapter = self.session.adapters.get("https://")
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if old_adapter is not None and self.pool_size:
+            old_adapter.close()
+        self.pool_size = pool_size
+
+    def _tune_rate_limit(self, resp: requests.Response) -> None:
+        limit = resp.headers.get("X-PCO-API-Request-Rate-Limit")
+        period = resp.headers.get("X-PCO-API-Request-Rate-Period")
+        count = resp.headers.get("X-PCO-API-Request-Rate-Count")
+        try:
+            if limit and period and int(limit) > 0 and float(period) > 0:
+                self.limiter.configure(int(limit), float(period))
+            if count:
+                self.limiter.observe(int(count))
+        except ValueError:
+            pass
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> requests.Response:
+        return retry_policy.call(lambda: self._get_once(url, params, headers), f"GET {url}")
+
+    def get_content(self, url: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+        """GET `url` and return the body, revalidating against the cache."""
+        if self.cache is None:
+            return self.get(url, params=params).content
+
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        cached = self.cache.load(full_url)
+        headers = self.cache.conditional_headers(cached[0]) if cached else None
+
+        resp = self.get(full_url, headers=headers)
+        if resp.status_code == 304 and cached:
+            self.cache.hit(full_url, cached[1])
+            return cached[1]
+        self.cache.store(full_url, resp)
+        return resp.content
+
+    def _get_once(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+    ) -> requests.Response:
+        for attempt in range(1, RATE_LIMIT_ATTEMPTS + 1):
+            with self.limiter:
+                resp = self.session.get(url, params=params, headers=headers, timeout=PCO_TIMEOUT)
+                self._tune_rate_limit(resp)
+            if resp.status_code != 429 or attempt == RATE_LIMIT_ATTEMPTS:
+                break
+            delay = retry_after_seconds(resp.headers.get("Retry-After"), PCO_RATE_PERIOD)
+            print(f"  PCO rate limit hit; waiting {delay:.1f}s (attempt {attempt}/{RATE_LIMIT_ATTEMPTS})")
+            self.limiter.pause(delay)
         resp.raise_for_status()
-        json_data = resp.json()
+        return resp
+
+    def connections_opened(self) -> int:
+        """Number of TCP connections opened so far across all pools."""
+        total = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    total += pool.num_connections
+        return total
+
+    def close(self) -> None:
+        self.session.close()
+
+
+@lru_cache(maxsize=None)
+def get_pco() -> PCOClient:
+    """The shared PCO client, created on first use."""
+    return PCOClient(required_env("PCO_APP_ID"), required_env("PCO_SECRET"))
+
+
+def pco_connections_opened() -> int:
+    # Snapshot replays never create a client; don't demand credentials for it.
+    return get_pco().connections_opened() if get_pco.cache_info().currsize else 0
+
+
+# --- Page decoding -----------------------------------------------------------
+
+if msgspec is not None:
+    class _Resource(msgspec.Struct):
+        type: str
+        id: str
+        attributes: Dict[str, Any] = {}
+
+
+@lru_cache(maxsize=None)
+def _page_decoder(attribute_names: Tuple[str, ...], relationship_names: Tuple[str, ...]) -> Any:
+    """msgspec decoder that only materialises the listed Group attributes
+    and relationships.
+
+    Anything not declared (other attributes and relationships,
+    resource-level `links`) is skipped without building Python objects.
+    Struct fields are positional (`f0`, `f1`, ...) renamed to the JSON member
+    names, since those needn't be Python identifiers ("display-name"); read
+    them back with msgspec.structs.astuple in the same order as the names.
+    """
+    def fields(names: Tuple[str, ...]) -> List[Tuple[str, Any, Any]]:
+        return [(f"f{i}", Any, msgspec.field(default=None, name=name)) for i, name in enumerate(names)]
+
+    attributes = msgspec.defstruct("GroupAttributes", fields(attribute_names))
+    relationships = msgspec.defstruct("GroupRelationships", fields(relationship_names))
+    group = msgspec.defstruct(
+        "Group",
+        [("type", str), ("id", str),
+         ("attributes", attributes, msgspec.field(default_factory=attributes)),
+         ("relationships", relationships, msgspec.field(default_factory=relationships))],
+    )
+    page = msgspec.defstruct(
+        "GroupPage",
+        [("data", List[group], []), ("included", List[_Resource], []),
+         ("links", Dict[str, Any], {}), ("meta", Dict[str, Any], {})],
+    )
+    return msgspec.json.Decoder(page)
+
+
+def decode_page(content: bytes, with_relationships: bool = False) -> Dict[str, Any]:
+    """Decode one PCO page body into the usual JSON:API dict shape.
+
+    Uses msgspec (decoding only the attributes transform_group reads, plus
+    the INCLUDE_RELATED relationships if asked) or orjson when installed,
+    and falls back to the stdlib json module.
+    """
+    if msgspec is not None:
+        names = tuple(dict.fromkeys(
+            name for sources in GROUP_ATTRIBUTE_SOURCES.values() for name in sources
+        ))
+        relations = INCLUDE_RELATED if with_relationships else ()
+        try:
+            page = _page_decoder(names, relations).decode(content)
+        except msgspec.ValidationError:
+            # Unexpected shape (e.g. an error document); decode it generically.
+            return msgspec.json.decode(content)
+        astuple = msgspec.structs.astuple
+        return {
+            "data": [
+                {"type": g.type, "id": g.id,
+                 "attributes": dict(zip(names, astuple(g.attributes))),
+                 "relationships": dict(zip(relations, astuple(g.relationships)))}
+                for g in page.data
+            ],
+            "included": [
+                {"type": r.type, "id": r.id, "attributes": r.attributes}
+                for r in page.included
+            ],
+            "links": page.links,
+            "meta": page.meta,
+        }
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Relationships we sideload with `include=` when --include-related is set.
+INCLUDE_RELATED = ("group_type", "location", "tags")
+
+# JSON:API type of each sideloaded relationship, for `fields[Type]=name`.
+RELATED_TYPES = {"group_type": "GroupType", "location": "Location", "tags": "Tag"}
+
+
+class IncludedIndex:
+    """`included` resources keyed by (type, id), de-duplicated across pages.
+
+    Pages are added as they stream in, so resolving a group's relationships
+    is a dict lookup rather than a scan over everything included so far.
+    """
+
+    def __init__(self) -> None:
+        self.resources: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    def add(self, included: List[Dict[str, Any]]) -> None:
+        for resource in included:
+            self.resources.setdefault((resource.get("type"), resource.get("id")), resource)
+
+    def name_of(self, ref: Dict[str, Any]) -> Optional[str]:
+        resource = self.resources.get((ref.get("type"), ref.get("id")))
+        if resource is None:
+            return None
+        return (resource.get("attributes") or {}).get("name")
+
+    def resolve(self, group: Dict[str, Any]) -> Dict[str, Any]:
+        """Names of the group's type, location and tags, where they're known."""
+        relationships = group.get("relationships") or {}
+
+        def linkage(name: str) -> List[Dict[str, Any]]:
+            data = (relationships.get(name) or {}).get("data")
+            if data is None:
+                return []
+            return data if isinstance(data, list) else [data]
+
+        resolved: Dict[str, Any] = {}
+        for relation in ("group_type", "location"):
+            for ref in linkage(relation)[:1]:
+                name = self.name_of(ref)
+                if name:
+                    resolved[relation] = name
+        tags = {ref.get("id"): self.name_of(ref) for ref in linkage("tags")}
+        if tags:
+            resolved["tags"] = tags
+        return resolved
+
+
+def resolve_page(groups: List[Dict[str, Any]], index: IncludedIndex) -> List[Dict[str, Any]]:
+    """Attach each group's resolved relationship names as `_resolved`.
+
+    transform_group reads them from there, which keeps each group
+    self-contained when it's shipped to a --workers process.
+    """
+    if index:
+        for group in groups:
+            group["_resolved"] = index.resolve(group)
+    return groups
+
 
+def _next_page_url(json_data: Dict[str, Any]) -> Optional[str]:
+    links = json_data.get("links", {}) or {}
+    print(f"  links: {links}")
+
+    next_url = links.get("next")
+
+    # Fallback, just in case
+    if not next_url:
+        meta = json_data.get("meta", {}) or {}
+        if meta:
+            print(f"  meta: {meta}")
+        next_url = meta.get("next") or meta.get("next_page_url")
+
+    return next_url
+
+
+def iter_group_pages(
+    concurrency: int = 1,
+    params: Optional[Dict[str, Any]] = None,
+    snapshot: Optional["SnapshotWriter"] = None,
+) -> Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Yield (groups, included) for each PCO page, in page order, as it arrives.
+
+    With `concurrency` > 1 the first page's `meta.total_count` is used to work
+    out every remaining `offset`, and those pages are fetched in parallel.
+    At most `concurrency` pages are in flight or buffered at a time, and they
+    are still yielded in offset order, so the output is the same as a
+    sequential walk of `links.next`.
+
+    Extra query `params` (e.g. a `where[...]` filter) are sent with every
+    request we build ourselves; `links.next` already carries them.
+
+    With a `snapshot`, every raw page body is also saved to it (in the same
+    order) and the snapshot is finished once the last page has been yielded.
+    """
+    # include=... is only sent with --include-related (see sync()).
+    params = {"per_page": PER_PAGE, "order": PAGE_ORDER, **(params or {})}
+    with_relationships = "include" in params
+    pco = get_pco()
+
+    def decode(content: bytes) -> Dict[str, Any]:
+        json_data = decode_page(content, with_relationships)
+        if snapshot is not None:
+            snapshot.write_page(content, len(json_data.get("data", []) or []))
+        return json_data
+
+    def unpack(page: int, json_data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         data = json_data.get("data", []) or []
         included = json_data.get("included", []) or []
-        links = json_data.get("links", {}) or {}
-
         print(f"  Page {page} returned {len(data)} groups")
-        print(f"  links: {links}")
+        return data, included
 
-        all_data.extend(data)
-        all_included.extend(included)
+    print(f"Requesting page 1: {BASE_URL}")
+    first = decode(pco.get_content(BASE_URL, params=params))
+    total_count = (first.get("meta", {}) or {}).get("total_count")
+    next_url = _next_page_url(first)
+    yield unpack(1, first)
+    del first
+
+    if concurrency > 1 and total_count is not None:
+        offsets = list(range(PER_PAGE, int(total_count), PER_PAGE))
+        print(f"  total_count={total_count}; fetching {len(offsets)} more "
+              f"page(s) with concurrency {concurrency}")
+        pco.ensure_pool_size(concurrency)
 
-        next_url = links.get("next")
+        def fetch_offset(offset: int) -> bytes:
+            print(f"Requesting offset {offset}: {BASE_URL}")
+            return pco.get_content(BASE_URL, params={**params, "offset": offset})
 
-        # Fallback, just in case
-        if not next_url:
-            meta = json_data.get("meta", {}) or {}
-            if meta:
-                print(f"  meta: {meta}")
-            next_url = meta.get("next") or meta.get("next_page_url")
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # Keep a bounded window of futures and always yield the oldest one,
+            # so order stays deterministic and memory doesn't grow with pages.
+            pending: Deque[Future] = deque()
+            remaining = iter(offsets)
+            for offset in islice(remaining, concurrency):
+                pending.append(pool.submit(fetch_offset, offset))
 
+            page = 1
+            while pending:
+                # Decoded here rather than in the workers so pages reach
+                # the snapshot in order.
+                json_data = decode(pending.popleft().result())
+                for offset in islice(remaining, 1):
+                    pending.append(pool.submit(fetch_offset, offset))
+                page += 1
+                yield unpack(page, json_data)
+    else:
+        # `links.next` has its own query string, so params only go on page 1.
         url = next_url
+        page = 1
+        while url:
+            page += 1
+            print(f"Requesting page {page}: {url}")
+            json_data = decode(pco.get_content(url))
+            url = _next_page_url(json_data)
+            yield unpack(page, json_data)
+
+    if snapshot is not None:
+        snapshot.close()
+
+
+def fetch_all_groups(
+    concurrency: int = 1,
+    params: Optional[Dict[str, Any]] = None,
+    pages: Optional[Iterable[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]] = None,
+) -> Tuple[List[Dict[str, Any]], IncludedIndex]:
+    """Fetch all groups from PCO with pagination.
+
+    Returns (all_groups_data, included_index). `included` resources are
+    indexed by (type, id) as pages come in; it's empty unless the request
+    asked PCO to `include` something.
+
+    `pages` replaces the PCO walk with another source of (groups, included)
+    pages, e.g. a snapshot.
+    """
+    all_data: List[Dict[str, Any]] = []
+    index = IncludedIndex()
+
+    if pages is None:
+        pages = iter_group_pages(concurrency=concurrency, params=params)
+    for data, included in pages:
+        all_data.extend(data)
+        index.add(included)
+
+    print(f"Fetched {len(all_data)} groups total "
+          f"({len(index)} included resource(s), "
+          f"{pco_connections_opened()} PCO connection(s) opened)")
+    return all_data, index
+
+
+# --- Snapshots ---------------------------------------------------------------
+
+# A snapshot is a directory of gzip'd NDJSON chunks, one raw PCO page body per
+# line, plus a manifest.json listing the chunks in page order. The raw bodies
+# are kept (not transformed rows) so a replay sees every attribute and
+# `included` resource the original pull did, whatever the transform does.
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_MANIFEST = "manifest.json"
+SNAPSHOT_PAGES_PER_CHUNK = int(os.environ.get("SNAPSHOT_PAGES_PER_CHUNK", "50"))
 
-    print(f"Fetched {len(all_data)} groups total from PCO")
-    return all_data, all_included
 
+class SnapshotWriter:
+    """Write PCO pages to a snapshot directory as they are fetched."""
 
-def transform_group(group: Dict[str, Any]) -> Dict[str, Any]:
-    """Transform a raw PCO group into one Supabase `groups` row using attributes only."""
+    def __init__(self, directory: str, params: Optional[Dict[str, Any]] = None):
+        self.directory = directory
+        self.params = dict(params or {})
+        self.created_at = datetime.now(timezone.utc)
+        self.chunks: List[Dict[str, Any]] = []
+        self.pages = 0
+        self.groups = 0
+        self._file: Optional[Any] = None
 
-    attrs = group.get("attributes", {}) or {}
+        os.makedirs(directory, exist_ok=True)
+        # Drop the old manifest first, so a pull that dies part way never
+        # leaves a snapshot that looks complete.
+        manifest = os.path.join(directory, SNAPSHOT_MANIFEST)
+        if os.path.exists(manifest):
+            os.remove(manifest)
 
-    # Try a few likely attribute names for each field; if a key doesn't exist,
-    # .get() will just return None, which is fine.
-    name = attrs.get("name")
-    description = attrs.get("description") or attrs.get("short_description")
+    def _next_chunk(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        name = f"pages-{len(self.chunks):05d}.ndjson.gz"
+        self._file = gzip.open(os.path.join(self.directory, name), "wb", compresslevel=6)
+        self.chunks.append({"file": name, "pages": 0, "groups": 0})
 
+    def write_page(self, content: bytes, groups: int) -> None:
+        if self._file is None or self.chunks[-1]["pages"] >= SNAPSHOT_PAGES_PER_CHUNK:
+            self._next_chunk()
+        # JSON strings can't hold raw newlines, so this only drops whitespace
+        # between tokens and each page stays on one line.
+        self._file.write(content.replace(b"\r", b"").replace(b"\n", b"") + b"\n")
+        self.chunks[-1]["pages"] += 1
+        self.chunks[-1]["groups"] += groups
+        self.pages += 1
+        self.groups += groups
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": self.created_at.isoformat(),
+            "base_url": BASE_URL,
+            "params": self.params,
+            "pages": self.pages,
+            "groups": self.groups,
+            "chunks": self.chunks,
+        }
+        path = os.path.join(self.directory, SNAPSHOT_MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+        print(f"Saved snapshot of {self.pages} page(s), {self.groups} groups "
+              f"to {self.directory}")
+
+
+def load_snapshot_manifest(directory: str) -> Dict[str, Any]:
+    path = os.path.join(directory, SNAPSHOT_MANIFEST)
+    if not os.path.exists(path):
+        raise RuntimeError(f"No complete snapshot in {directory} (missing {SNAPSHOT_MANIFEST})")
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise RuntimeError(f"Unsupported snapshot format in {directory}: "
+                           f"{manifest.get('format')!r}")
+    return manifest
+
+
+def iter_snapshot_pages(
+    directory: str,
+) -> Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Yield (groups, included) for each page saved in a snapshot, in order.
+
+    Chunks are decompressed and read a line (page) at a time, so replaying a
+    snapshot holds no more of it in memory than a live pull would.
+    """
+    manifest = load_snapshot_manifest(directory)
+    with_relationships = "include" in (manifest.get("params") or {})
+    print(f"Replaying snapshot {directory}: {manifest['pages']} page(s), "
+          f"{manifest['groups']} groups pulled {manifest['created_at']}")
+
+    page = 0
+    for chunk in manifest["chunks"]:
+        with gzip.open(os.path.join(directory, chunk["file"]), "rb") as f:
+            for line in f:
+                page += 1
+                json_data = decode_page(line, with_relationships)
+                data = json_data.get("data", []) or []
+                print(f"  Page {page} returned {len(data)} groups")
+                yield data, json_data.get("included", []) or []
+
+
+# Attribute names tried for each `groups` column, in priority order; the first
+# truthy one wins, exactly like `attrs.get(a) or attrs.get(b) or ...` (for
+# COUNT_COLUMNS, the first one present). This is also where the sparse
+# fieldset (`fields[Group]=...`) comes from, so add new lookups here, not
+# inline. A JSON file passed with --field-map (or the
+# GROUP_FIELD_MAP env var) can override the sources for any column.
+DEFAULT_FIELD_MAP: Dict[str, Tuple[str, ...]] = {
+    "name": ("name",),
+    "description": ("description", "short_description"),
     # Campus-ish
-    campus = (
-        attrs.get("campus_name")
-        or attrs.get("campus")
-        or attrs.get("location_name")
-    )
+    "campus": ("campus_name", "campus", "location_name"),
+    # Meeting day; stored as a one-element days_of_week array
+    "days_of_week": ("meeting_day", "meets_on"),
+    "time_of_day": ("meeting_time", "time", "starts_at"),
+    "stage_of_life": ("life_stage", "group_lifestage", "age_range"),
+    "group_type": ("group_type", "type", "category"),
+    # Capacity / enrollment. Groups with no count here can be filled in with
+    # --membership-counts (see MembershipCounts).
+    "max_size": ("capacity", "max_participants"),
+    "current_size": ("memberships_count", "enrollment", "current_participants"),
+    "church_center_url": ("url", "web_url", "public_url"),
+    # Open unless archived
+    "is_open": ("archived_at",),
+}
 
-    # Meeting day / days_of_week
-    meeting_day = attrs.get("meeting_day") or attrs.get("meets_on")
-    days_of_week = [meeting_day] if meeting_day else None
+# Counts, where 0 is a real answer: their fallbacks only apply when an
+# attribute is missing (None), not when it's falsy. Otherwise an empty group
+# would fall through to None and cost a --membership-counts lookup.
+COUNT_COLUMNS = ("current_size",)
 
-    # Time of day
-    time_of_day = (
-        attrs.get("meeting_time")
-        or attrs.get("time")
-        or attrs.get("starts_at")
-    )
+# Column order of the rows we send to Supabase.
+ROW_COLUMNS = (
+    "pco_group_id", "name", "description", "campus", "days_of_week",
+    "time_of_day", "stage_of_life", "group_type", "is_open", "max_size",
+    "current_size", "church_center_url", "tags",
+)
 
-    # Stage of life
-    stage_of_life = (
-        attrs.get("life_stage")
-        or attrs.get("group_lifestage")
-        or attrs.get("age_range")
-    )
+# The field map currently in use; see set_field_map().
+GROUP_ATTRIBUTE_SOURCES: Dict[str, Tuple[str, ...]] = dict(DEFAULT_FIELD_MAP)
 
-    # Group type
-    group_type = (
-        attrs.get("group_type")
-        or attrs.get("type")
-        or attrs.get("category")
+
+def group_fieldset() -> str:
+    """Comma-separated list of every Group attribute transform_group reads."""
+    names = dict.fromkeys(
+        name for sources in GROUP_ATTRIBUTE_SOURCES.values() for name in sources
     )
+    return ",".join(names)
+
+
+def load_field_map(path: str) -> Dict[str, Tuple[str, ...]]:
+    """Read a {column: [attribute, ...]} JSON file over the defaults."""
+    with open(path, "r", encoding="utf-8") as f:
+        overrides = json.load(f)
+
+    field_map = dict(DEFAULT_FIELD_MAP)
+    for column, sources in overrides.items():
+        if column not in DEFAULT_FIELD_MAP:
+            raise ValueError(f"{path}: unknown column {column!r}")
+        if isinstance(sources, str):
+            sources = [sources]
+        if not sources or not all(isinstance(s, str) and s for s in sources):
+            raise ValueError(f"{path}: {column!r} needs a list of attribute names")
+        if any("," in s for s in sources):
+            # They're sent comma-separated in fields[Group].
+            raise ValueError(f"{path}: {column!r} has an attribute name with a comma")
+        field_map[column] = tuple(sources)
+    return field_map
+
 
-    # Capacity / enrollment
-    max_size = attrs.get("capacity") or attrs.get("max_participants")
-    current_size = attrs.get("enrollment") or attrs.get("current_participants")
+def compile_transform(field_map: Dict[str, Tuple[str, ...]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Generate a transform function specialised for `field_map`.
 
-    # URLs
-    church_center_url = (
-        attrs.get("url")
-        or attrs.get("web_url")
-        or attrs.get("public_url")
+    The fallback chains are unrolled into straight-line `get(a) or get(b)`
+    code once, instead of being walked per field for every group. That's the
+    same code the hand-written transform had, so a configurable map costs
+    nothing per group; it doesn't make the transform any faster than that.
+    COUNT_COLUMNS chain on `is not None` instead, so a count of 0 sticks.
+    """
+    def chain_expr(column: str) -> str:
+        if column in COUNT_COLUMNS:
+            *first, last = field_map[column]
+            return "".join(f"n if (n := get({name!r})) is not None else " for name in first) + f"get({last!r})"
+        return " or ".join(f"get({name!r})" for name in field_map[column])
+
+    values = {column: chain_expr(column) for column in field_map}
+    values["days_of_week"] = f"[v] if (v := {values['days_of_week']}) else None"
+    values["is_open"] = f"not ({values['is_open']})"
+    values["pco_group_id"] = "group.get('id')"
+    # Sideloaded relationships (see resolve_page) win for group_type and
+    # fill campus from the location when no campus attribute is set.
+    values["group_type"] = f"rel.get('group_type') or {values['group_type']}"
+    values["campus"] = f"(c := {values['campus']}) or rel.get('location', c)"
+    # Without --include-related tags is just an empty object.
+    values["tags"] = "rel.get('tags') or {}"
+
+    lines = [
+        "def transform_group(group):",
+        "    attrs = group.get('attributes') or {}",
+        "    get = attrs.get",
+        "    rel = group.get('_resolved') or {}",
+        "    return {",
+    ]
+    lines += [f"        {column!r}: {values[column]}," for column in ROW_COLUMNS]
+    lines.append("    }")
+
+    namespace: Dict[str, Any] = {}
+    exec(compile("\n".join(lines), "<transform_group>", "exec"), namespace)
+    transform = namespace["transform_group"]
+    transform.__doc__ = (
+        "Transform a raw PCO group into one Supabase `groups` row, using its "
+        "attributes and any relationships resolved by resolve_page()."
     )
+    return transform
+
+
+def set_field_map(field_map: Dict[str, Tuple[str, ...]]) -> None:
+    """Switch the field map used by transform_group and the sparse fieldset."""
+    global GROUP_ATTRIBUTE_SOURCES, transform_group
+    GROUP_ATTRIBUTE_SOURCES = dict(field_map)
+    transform_group = compile_transform(GROUP_ATTRIBUTE_SOURCES)
 
-    # Open / archived
-    is_open = not bool(attrs.get("archived_at"))
 
-    return {
-        "pco_group_id": group.get("id"),
-        "name": name,
-        "description": description,
-        "campus": campus,
-        "days_of_week": days_of_week,
-        "time_of_day": time_of_day,
-        "stage_of_life": stage_of_life,
-        "group_type": group_type,
-        "is_open": is_open,
-        "max_size": max_size,
-        "current_size": current_size,
-        "church_center_url": church_center_url,
-        # You said you don't need tags; we'll just store an empty object.
-        "tags": {},
-    }
+transform_group = compile_transform(GROUP_ATTRIBUTE_SOURCES)
 
 
 def clear_groups_table() -> None:
     """Delete all existing rows from public.groups before re-inserting."""
     print("Clearing existing groups from Supabase...")
-    response = supabase.table("groups").delete().neq("pco_group_id", "").execute()
+    response = execute_with_retry(
+        get_supabase().table("groups").delete().neq("pco_group_id", ""),
+        "Clearing groups",
+    )
     error = getattr(response, "error", None)
     if error:
         print("Error clearing groups:", error)
@@ -199,38 +1046,1302 @@ def clear_groups_table() -> None:
     print("Existing groups cleared.")
 
 
-def sync() -> None:
-    print("Starting sync from Planning Center to Supabase...")
+# Rows per Supabase write request. The adaptive batcher starts here and moves
+# between the min/max as it measures throughput.
+BATCH_SIZE = 200
+MIN_BATCH_SIZE = 20
+MAX_BATCH_SIZE = 2000
+
+# Hard cap on the JSON body of one write request.
+BATCH_MAX_BYTES = int(os.environ.get("SUPABASE_BATCH_MAX_BYTES", str(1024 * 1024)))
+
+# Rows per page when reading back from Supabase (PostgREST's default max-rows).
+SELECT_PAGE_SIZE = 1000
+
+
+def row_size(row: Dict[str, Any]) -> int:
+    """Bytes `row` adds to a JSON array request body (including the comma)."""
+    return len(json.dumps(row, default=str).encode("utf-8")) + 2
+
+
+class AdaptiveBatcher:
+    """Groups rows into write batches capped by row count and by body size.
+
+    No batch goes over `max_bytes` (a single row bigger than that is sent on
+    its own). After each write, `record()` is given the batch latency and
+    nudges the row target up or down, keeping whichever direction improved
+    rows/second last time.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = BATCH_MAX_BYTES,
+        initial_rows: int = BATCH_SIZE,
+        min_rows: int = MIN_BATCH_SIZE,
+        max_rows: int = MAX_BATCH_SIZE,
+    ):
+        self.max_bytes = max_bytes
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.target_rows = initial_rows
+        self.pending: List[Dict[str, Any]] = []
+        self.pending_bytes = 2  # "[]"
+        self._direction = 1
+        self._last_throughput: Optional[float] = None
+
+    def add(self, row: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Queue `row`; return a full batch when one is ready to send."""
+        size = row_size(row)
+        batch = None
+        if self.pending and self.pending_bytes + size > self.max_bytes:
+            batch = self.flush()
+        if size + 2 > self.max_bytes:
+            print(f"Warning: group {row.get('pco_group_id')} is {size} bytes, "
+                  f"over the {self.max_bytes} byte batch cap; sending it alone.")
+        self.pending.append(row)
+        self.pending_bytes += size
+        if batch is None and len(self.pending) >= self.target_rows:
+            batch = self.flush()
+        return batch
+
+    def flush(self) -> Optional[List[Dict[str, Any]]]:
+        """Return whatever is queued (or None) and start a new batch."""
+        if not self.pending:
+            return None
+        batch = self.pending
+        self.pending = []
+        self.pending_bytes = 2
+        return batch
+
+    def record(self, rows: int, seconds: float) -> None:
+        """Feed back how long a batch of `rows` took to write."""
+        throughput = rows / max(seconds, 1e-6)
+        if self._last_throughput is not None and throughput < self._last_throughput:
+            self._direction = -self._direction
+        self._last_throughput = throughput
+        factor = 1.25 if self._direction > 0 else 0.8
+        self.target_rows = max(self.min_rows, min(self.max_rows, int(self.target_rows * factor)))
+
+
+def write_batch(batch: List[Dict[str, Any]], batch_no: int, upsert: bool = False) -> None:
+    """Insert one batch into public.groups, or upsert it on pco_group_id."""
+    verb = "Upserting" if upsert else "Inserting"
+    print(f"{verb} batch {batch_no} ({len(batch)} rows)...")
+
+    table = get_supabase().table("groups")
+    if upsert:
+        query = table.upsert(batch, on_conflict="pco_group_id")
+    else:
+        query = table.insert(batch)
+    # Upserts can be repeated; a plain insert that timed out may already be
+    # in, so it's only retried when it certainly wasn't applied.
+    response = execute_with_retry(query, f"Batch {batch_no}", idempotent=upsert)
+
+    error = getattr(response, "error", None)
+    if error:
+        print("Supabase error:", error)
+        raise RuntimeError(error)
+    else:
+        print(f"Batch {'upserted' if upsert else 'inserted'} successfully")
+
+
+def write_rows(rows: Iterable[Dict[str, Any]], upsert: bool = False, writers: int = 1) -> int:
+    """Write `rows` to public.groups in adaptive batches. Returns rows written.
+
+    Up to `writers` batches are in flight at once; when they're all busy we
+    wait for one to finish before pulling more rows (back-pressure). A batch
+    that fails is retried on its own under the shared retry policy; any batch
+    still failing after that is reported and the run fails at the end.
+    """
+    batcher = AdaptiveBatcher()
+    batch_no = 0
+    total = 0
+    failed: List[int] = []
+    in_flight: Dict[Future, Tuple[int, List[Dict[str, Any]]]] = {}
+
+    def send(batch: List[Dict[str, Any]], no: int) -> float:
+        started = time.perf_counter()
+        write_batch(batch, no, upsert=upsert)
+        return time.perf_counter() - started
+
+    def collect(return_when: str) -> None:
+        nonlocal total
+        done, _ = wait(list(in_flight), return_when=return_when)
+        for future in done:
+            no, batch = in_flight.pop(future)
+            try:
+                elapsed = future.result()
+            except Exception as exc:
+                print(f"Batch {no} ({len(batch)} rows) failed for good: {exc}")
+                failed.append(no)
+                continue
+            batcher.record(len(batch), elapsed)
+            total += len(batch)
+
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        def submit(batch: List[Dict[str, Any]]) -> None:
+            nonlocal batch_no
+            if len(in_flight) >= writers:
+                collect(FIRST_COMPLETED)
+            batch_no += 1
+            in_flight[pool.submit(send, batch, batch_no)] = (batch_no, batch)
 
-    data, _included = fetch_all_groups()
+        for row in rows:
+            batch = batcher.add(row)
+            if batch:
+                submit(batch)
 
-    rows = [transform_group(g) for g in data]
+        batch = batcher.flush()
+        if batch:
+            submit(batch)
+
+        if in_flight:
+            collect(ALL_COMPLETED)
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} batch(es) failed: {sorted(failed)}")
+    return total
+
+
+# --- Direct Postgres bulk load (--copy) ------------------------------------
+
+# Columns loaded by COPY; everything else keeps its table default.
+COPY_COLUMNS = ROW_COLUMNS + ("row_hash", "deleted_at")
+
+
+def connect_db() -> Any:
+    """Open a psycopg connection to the Supabase Postgres database.
+
+    Needs SUPABASE_DB_URL (the connection string from the project's database
+    settings) and psycopg 3, both only for --copy, --swap and `migrate`.
+    """
+    try:
+        import psycopg
+    except ImportError:
+        raise RuntimeError("--copy, --swap and migrate need psycopg: pip install 'psycopg[binary]'")
+    return psycopg.connect(required_env("SUPABASE_DB_URL"))
+
+
+def _stage_rows(cur: Any, rows: Iterable[Dict[str, Any]]) -> int:
+    """COPY `rows` into a temporary groups_staging table; returns the count.
+
+    The staging table only has the loaded columns (none of the constraints or
+    defaults of public.groups) plus an arrival `seq`, and is dropped when the
+    transaction ends.
+    """
+    from psycopg.types.json import Jsonb
+
+    columns = ", ".join(COPY_COLUMNS)
+    tags_at = COPY_COLUMNS.index("tags")
+    copied = 0
+
+    cur.execute(
+        f"create temp table groups_staging on commit drop as "
+        f"select {columns} from public.groups with no data"
+    )
+    cur.execute("alter table groups_staging add column seq bigint generated always as identity")
+
+    with cur.copy(f"copy groups_staging ({columns}) from stdin") as copy:
+        for row in rows:
+            values = [row.get(c) for c in COPY_COLUMNS]
+            if values[tags_at] is not None:
+                values[tags_at] = Jsonb(values[tags_at])
+            copy.write_row(values)
+            copied += 1
+    return copied
+
+
+def _merge_staged(cur: Any, table: str, upsert: bool = True) -> int:
+    """Upsert groups_staging into `table` on pco_group_id; returns rows merged.
+
+    Without `upsert` the rows are plainly inserted, for a `table` that is
+    empty and has no unique index on pco_group_id yet.
+    """
+    columns = ", ".join(COPY_COLUMNS)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in COPY_COLUMNS if c != "pco_group_id")
+    conflict = f" on conflict (pco_group_id) do update set {updates}" if upsert else ""
+    # ON CONFLICT can't touch a row twice in one statement, so if PCO
+    # handed us a group twice keep the copy that arrived last.
+    cur.execute(
+        f"insert into {table} ({columns}) "
+        f"select distinct on (pco_group_id) {columns} from groups_staging "
+        f"order by pco_group_id, seq desc"
+        f"{conflict}"
+    )
+    return cur.rowcount
+
+
+def copy_rows(rows: Iterable[Dict[str, Any]], upsert: bool = True) -> int:
+    """Bulk-load `rows` into public.groups over a direct Postgres connection.
+
+    Rows are streamed with COPY into a temporary staging table and merged in
+    with one INSERT ... ON CONFLICT, all in one transaction, so a failed load
+    leaves public.groups as it was. Without `upsert` the table is emptied in
+    that same transaction (what --replace does through PostgREST). Returns
+    the number of rows copied.
+
+    The COPY consumes `rows` as it goes, so a failure isn't retried here;
+    the rollback makes re-running the sync safe.
+    """
+    started = time.perf_counter()
 
-    print(f"Prepared {len(rows)} rows to insert into Supabase")
+    print("Copying rows into Postgres...")
+    with connect_db() as conn, conn.cursor() as cur:
+        copied = _stage_rows(cur, rows)
+        if not upsert:
+            print("Clearing existing groups...")
+            cur.execute("delete from public.groups")
+        merged = _merge_staged(cur, "public.groups")
 
-    # Clear table first
-    clear_groups_table()
+    print(f"Copied {copied} rows and merged {merged} into public.groups "
+          f"in {time.perf_counter() - started:.1f}s")
+    return copied
 
-    batch_size = 200
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i: i + batch_size]
-        print(f"Inserting batch {i // batch_size + 1} ({len(batch)} rows)...")
 
-        response = (
-            supabase.table("groups")
-            .insert(batch)
-            .execute()
+# How long the swap may wait for its lock on public.groups. Giving up (and
+# rolling back) beats queueing every reader behind a long-running query.
+SWAP_LOCK_TIMEOUT = os.environ.get("SYNC_SWAP_LOCK_TIMEOUT", "10s")
+
+
+def _copy_access(cur: Any) -> None:
+    """Give public.groups_next the grants and RLS setup of public.groups.
+
+    CREATE TABLE ... LIKE copies columns, defaults and constraints but none
+    of these, and without them PostgREST's roles lose access.
+    """
+    cur.execute(
+        "select case when a.grantee = 0 then 'public' "
+        "else quote_ident(pg_get_userbyid(a.grantee)) end, a.privilege_type "
+        "from pg_class c, aclexplode(c.relacl) a "
+        "where c.oid = 'public.groups'::regclass"
+    )
+    for grantee, privilege in cur.fetchall():
+        cur.execute(f"grant {privilege} on public.groups_next to {grantee}")
+
+    cur.execute(
+        "select relrowsecurity, relforcerowsecurity from pg_class "
+        "where oid = 'public.groups'::regclass"
+    )
+    enabled, forced = cur.fetchone()
+    if enabled:
+        cur.execute("alter table public.groups_next enable row level security")
+    if forced:
+        cur.execute("alter table public.groups_next force row level security")
+
+    cur.execute(
+        "select quote_ident(policyname), permissive, cmd, "
+        "array_to_string(array(select case when r = 'public' then r else quote_ident(r) end "
+        "from unnest(roles) r), ', '), qual, with_check "
+        "from pg_policies where schemaname = 'public' and tablename = 'groups'"
+    )
+    for name, permissive, cmd, roles, qual, with_check in cur.fetchall():
+        policy = f"create policy {name} on public.groups_next as {permissive} for {cmd} to {roles}"
+        if qual:
+            policy += f" using ({qual})"
+        if with_check:
+            policy += f" with check ({with_check})"
+        cur.execute(policy)
+
+
+def _build_indexes(cur: Any) -> Dict[str, str]:
+    """Create public.groups' indexes (and the constraints that own one) on
+    public.groups_next, which is expected to be loaded already.
+
+    Building each index once over the finished table is cheaper than keeping
+    it up to date row by row through the COPY and merge. The original names
+    are still taken by public.groups, so they're built under temporary ones;
+    returns {temporary name: original name}.
+    """
+    names: Dict[str, str] = {}
+    cur.execute(
+        "select conname, pg_get_constraintdef(oid) from pg_constraint "
+        "where conrelid = 'public.groups'::regclass and contype in ('p', 'u', 'x') "
+        "order by conname"
+    )
+    for name, definition in cur.fetchall():
+        temporary = f"groups_next_{len(names)}"
+        cur.execute(f'alter table public.groups_next add constraint "{temporary}" {definition}')
+        names[temporary] = name
+
+    cur.execute(
+        "select i.relname, x.indisunique, pg_get_indexdef(x.indexrelid) "
+        "from pg_index x join pg_class i on i.oid = x.indexrelid "
+        "where x.indrelid = 'public.groups'::regclass and not exists ("
+        "select 1 from pg_constraint c where c.conrelid = x.indrelid "
+        "and c.conindid = x.indexrelid and c.contype in ('p', 'u', 'x')) "
+        "order by i.relname"
+    )
+    for name, unique, definition in cur.fetchall():
+        temporary = f"groups_next_{len(names)}"
+        # "CREATE INDEX name ON public.groups USING ..." -> "USING ...".
+        method = "using " + definition.split(" USING ", 1)[1]
+        kind = "unique index" if unique else "index"
+        cur.execute(f'create {kind} "{temporary}" on public.groups_next {method}')
+        names[temporary] = name
+    return names
+
+
+def _swap_in_groups_next(cur: Any, index_names: Dict[str, str]) -> None:
+    """Rename public.groups_next over public.groups and drop the old table.
+
+    `index_names` maps groups_next's index names to the ones they take over
+    (see _build_indexes).
+    """
+    cur.execute("select pg_get_serial_sequence('public.groups', 'id')")
+    sequence = cur.fetchone()[0]
+
+    cur.execute(f"set local lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+    cur.execute("lock table public.groups in access exclusive mode")
+    cur.execute("alter table public.groups rename to groups_old")
+    cur.execute("alter table public.groups_next rename to groups")
+    if sequence:
+        # The id default was copied, but the sequence still belongs to the
+        # old table and would be dropped with it.
+        cur.execute(f"alter sequence {sequence} owned by public.groups.id")
+    cur.execute("drop table public.groups_old")
+
+    # Put the original index (and constraint) names back now they're free.
+    for temporary, name in index_names.items():
+        cur.execute(f'alter index public."{temporary}" rename to "{name}"')
+
+    # The table PostgREST had cached is gone; have it reload (on commit).
+    cur.execute("notify pgrst, 'reload schema'")
+
+
+def swap_rows(rows: Iterable[Dict[str, Any]]) -> int:
+    """Replace public.groups with a freshly loaded copy in one transaction.
+
+    `rows` are bulk-loaded into a new public.groups_next (created LIKE
+    public.groups, so with the same columns and constraints, plus its grants
+    and RLS policies), its indexes are built over the loaded rows, and it is
+    then renamed over public.groups. Until
+    the commit, readers keep seeing the old table in full; the only lock they
+    can meet is the brief one around the rename. The new table also starts
+    without any of the dead tuples a mass delete leaves behind. Groups that
+    are no longer in `rows` are carried over tombstoned.
+
+    Anything else hanging off public.groups (views, triggers, foreign keys)
+    is not carried over; a view on it makes the drop fail and the whole swap
+    roll back. Returns the number of rows loaded.
+    """
+    started = time.perf_counter()
+
+    print("Loading rows into public.groups_next...")
+    with connect_db() as conn, conn.cursor() as cur:
+        cur.execute("drop table if exists public.groups_next")
+        # Indexes come after the load (see _build_indexes).
+        cur.execute("create table public.groups_next (like public.groups including all excluding indexes)")
+        _copy_access(cur)
+        copied = _stage_rows(cur, rows)
+        merged = _merge_staged(cur, "public.groups_next", upsert=False)
+        if not merged:
+            # Same reasoning as prune_missing_groups: more likely a PCO
+            # hiccup than a church with no groups.
+            raise RuntimeError("No groups to load; not swapping in an empty table.")
+
+        # Groups PCO no longer returns carry over as tombstones, and
+        # existing tombstones keep their date, until purge_tombstones().
+        cur.execute(
+            "insert into public.groups_next select * from public.groups g "
+            "where not exists (select 1 from public.groups_next n "
+            "where n.pco_group_id = g.pco_group_id)"
         )
+        cur.execute(
+            "update public.groups_next set deleted_at = now() "
+            "where deleted_at is null and pco_group_id not in "
+            "(select pco_group_id from groups_staging)"
+        )
+        tombstoned = cur.rowcount
+        print(f"Loaded {merged} rows ({tombstoned} newly tombstoned); building indexes...")
+        index_names = _build_indexes(cur)
+        cur.execute("analyze public.groups_next")
+
+        print("Swapping public.groups_next in...")
+        _swap_in_groups_next(cur, index_names)
+
+    print(f"Swapped in {merged} groups in {time.perf_counter() - started:.1f}s")
+    return copied
+
+
+def call_sync_rpc(
+    rows: List[Dict[str, Any]],
+    keep_ids: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """Upsert `rows` (and prune to `keep_ids`) in one sync_groups() call.
+
+    See migrations/0002_sync_groups_rpc.sql. Returns the function's
+    {"upserted": n, "deleted": n} counts.
+    """
+    action = f"{len(rows)} rows"
+    if keep_ids is not None:
+        action += f", keeping {len(keep_ids)} groups"
+    print(f"Calling sync_groups RPC ({action})...")
+
+    response = execute_with_retry(
+        get_supabase().rpc("sync_groups", {"rows": rows, "keep_ids": keep_ids}),
+        "sync_groups RPC",
+    )
+    error = getattr(response, "error", None)
+    if error:
+        print("Supabase error:", error)
+        raise RuntimeError(error)
+
+    result = response.data or {}
+    print(f"sync_groups upserted {result.get('upserted', 0)} rows "
+          f"and deleted {result.get('deleted', 0)}")
+    return result
+
+
+def compute_row_hash(row: Dict[str, Any]) -> str:
+    """Stable hash of a transformed row, ignoring any existing `row_hash`."""
+    payload = {k: v for k, v in row.items() if k != "row_hash"}
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def fetch_existing_hashes() -> Tuple[Dict[str, Optional[str]], Set[str]]:
+    """Read back public.groups as ({pco_group_id: row_hash}, tombstoned ids).
+
+    The hashes only cover live rows; groups with a `deleted_at` are returned
+    separately so a group that comes back can be revived.
+    """
+    hashes: Dict[str, Optional[str]] = {}
+    tombstoned: Set[str] = set()
+    start = 0
+    while True:
+        response = execute_with_retry(
+            get_supabase().table("groups")
+            .select("pco_group_id,row_hash,deleted_at")
+            .order("pco_group_id")
+            .range(start, start + SELECT_PAGE_SIZE - 1),
+            "Reading existing groups",
+        )
+        error = getattr(response, "error", None)
+        if error:
+            print("Error reading existing groups:", error)
+            raise RuntimeError(error)
+        rows = response.data or []
+        for row in rows:
+            if row.get("deleted_at"):
+                tombstoned.add(row["pco_group_id"])
+            else:
+                hashes[row["pco_group_id"]] = row.get("row_hash")
+        if len(rows) < SELECT_PAGE_SIZE:
+            return hashes, tombstoned
+        start += SELECT_PAGE_SIZE
+
+
+class RowDiff:
+    """Splits transformed rows into added / changed / unchanged against the
+    hashes already stored in Supabase, so only new or changed rows are sent.
+    """
+
+    def __init__(
+        self,
+        existing: Optional[Dict[str, Optional[str]]] = None,
+        tombstoned: Optional[Set[str]] = None,
+    ):
+        # None means "don't diff": every row is treated as new.
+        self.existing = existing
+        self.tombstoned = tombstoned or set()
+        self.seen_ids: Set[str] = set()
+        self.added = 0
+        self.revived = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.duplicates = 0
+
+    def filter(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Stamp each row with its `row_hash` and return the ones to write.
+
+        A group already seen this run is dropped: if PCO's pages shift under
+        a concurrent pull it can come back twice, and upserting it twice in
+        one batch fails ("ON CONFLICT DO UPDATE command cannot affect row a
+        second time").
+        """
+        to_write: List[Dict[str, Any]] = []
+        for row in rows:
+            group_id = row["pco_group_id"]
+            if group_id in self.seen_ids:
+                self.duplicates += 1
+                continue
+            self.seen_ids.add(group_id)
+            # Rows from the process pool arrive already hashed.
+            if "row_hash" not in row:
+                row["row_hash"] = compute_row_hash(row)
+
+            if group_id in self.tombstoned:
+                self.revived += 1
+            elif self.existing is None or group_id not in self.existing:
+                self.added += 1
+            elif self.existing[group_id] == row["row_hash"]:
+                self.unchanged += 1
+                continue
+            else:
+                self.changed += 1
+            # Clears the tombstone on revived groups; the same key has to be
+            # on every row of a batch, and it isn't part of the hash.
+            row["deleted_at"] = None
+            to_write.append(row)
+        return to_write
+
+    def summary(self) -> str:
+        summary = (f"{self.added} added, {self.revived} revived, {self.changed} changed, "
+                   f"{self.unchanged} unchanged, {self.removed} removed")
+        if self.duplicates:
+            summary += f", {self.duplicates} duplicate(s) skipped"
+        return summary
+
 
+def prune_missing_groups(diff: RowDiff) -> None:
+    """Tombstone rows whose pco_group_id wasn't in the current PCO snapshot.
+
+    Missing groups get `deleted_at` set rather than being deleted, so readers
+    (and caches downstream) can see what went away; purge_tombstones() hard
+    deletes them later. Rows already tombstoned aren't touched again.
+    """
+    if not diff.seen_ids:
+        # An empty snapshot is much more likely to be a PCO hiccup than a
+        # church with no groups; don't wipe the table over it.
+        print("No groups fetched from PCO; skipping prune.")
+        return
+
+    existing_ids = set(diff.existing) if diff.existing is not None else set(fetch_existing_hashes()[0])
+    missing = sorted(existing_ids - diff.seen_ids)
+    print(f"Tombstoning {len(missing)} group(s) no longer in PCO...")
+
+    deleted_at = datetime.now(timezone.utc).isoformat()
+    for i in range(0, len(missing), BATCH_SIZE):
+        chunk = missing[i: i + BATCH_SIZE]
+        response = execute_with_retry(
+            get_supabase().table("groups")
+            .update({"deleted_at": deleted_at})
+            .in_("pco_group_id", chunk)
+            .is_("deleted_at", "null"),
+            "Pruning groups",
+        )
         error = getattr(response, "error", None)
         if error:
-            print("Supabase error:", error)
+            print("Error pruning groups:", error)
             raise RuntimeError(error)
+
+    diff.removed = len(missing)
+    print("Prune complete.")
+
+
+def purge_tombstones(days: int) -> int:
+    """Hard-delete groups tombstoned more than `days` days ago; returns how many."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    print(f"Purging groups tombstoned before {cutoff}...")
+    response = execute_with_retry(
+        get_supabase().table("groups").delete().lt("deleted_at", cutoff),
+        "Purging tombstones",
+    )
+    error = getattr(response, "error", None)
+    if error:
+        print("Error purging tombstones:", error)
+        raise RuntimeError(error)
+    purged = len(response.data or [])
+    print(f"Purged {purged} tombstoned group(s).")
+    return purged
+
+
+# --- Incremental sync watermark ------------------------------------------
+
+WATERMARK_KEY = "groups_updated_at"
+
+# Re-read a little before the last run started so clock skew between us and
+# PCO can't drop a change. Upserting a few rows twice is harmless.
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+
+def load_watermark() -> Optional[str]:
+    """Return the saved `updated_at` high-water mark, or None if there isn't one."""
+    response = execute_with_retry(
+        get_supabase().table("sync_state")
+        .select("value")
+        .eq("key", WATERMARK_KEY),
+        "Reading sync_state",
+    )
+    error = getattr(response, "error", None)
+    if error:
+        print("Error reading sync_state:", error)
+        raise RuntimeError(error)
+    rows = response.data or []
+    return rows[0]["value"] if rows else None
+
+
+def save_watermark(started_at: datetime) -> None:
+    """Persist the watermark for the next incremental run."""
+    value = (started_at - WATERMARK_OVERLAP).strftime("%Y-%m-%dT%H:%M:%SZ")
+    response = execute_with_retry(
+        get_supabase().table("sync_state")
+        .upsert({"key": WATERMARK_KEY, "value": value}, on_conflict="key"),
+        "Saving sync_state",
+    )
+    error = getattr(response, "error", None)
+    if error:
+        print("Error saving sync_state:", error)
+        raise RuntimeError(error)
+    print(f"Saved watermark {WATERMARK_KEY}={value}")
+
+
+# --- Transform stage -------------------------------------------------------
+
+# Pages handed to a worker process at a time. Big enough that pickling the
+# pages and rows is small next to the transform work, small enough to keep
+# memory bounded while streaming.
+TRANSFORM_CHUNK_PAGES = 10
+
+
+def _init_transform_worker(field_map: Dict[str, Tuple[str, ...]]) -> None:
+    # Workers need the same --field-map as the parent.
+    set_field_map(field_map)
+
+
+def _transform_chunk(pages: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Worker side: transform and hash a chunk of pages."""
+    rows = [transform_group(g) for page in pages for g in page]
+    for row in rows:
+        row["row_hash"] = compute_row_hash(row)
+    return rows
+
+
+def transform_pages(
+    pages: Iterable[List[Dict[str, Any]]],
+    workers: int = 1,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield transformed rows for `pages` of raw groups, in page order.
+
+    With `workers` > 1 pages are sent to a process pool in chunks of
+    TRANSFORM_CHUNK_PAGES, with at most two chunks per worker in flight.
+    Chunks are yielded in submission order, so output is deterministic.
+    """
+    if workers <= 1:
+        for page in pages:
+            yield [transform_group(g) for g in page]
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_transform_worker,
+        initargs=(GROUP_ATTRIBUTE_SOURCES,),
+    ) as pool:
+        pending: Deque[Future] = deque()
+        page_iter = iter(pages)
+        while True:
+            while len(pending) < workers * 2:
+                chunk = list(islice(page_iter, TRANSFORM_CHUNK_PAGES))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_transform_chunk, chunk))
+            if not pending:
+                return
+            yield pending.popleft().result()
+
+
+# --- Membership counts -----------------------------------------------------
+
+MEMBERSHIPS_URL = "https://api.planningcenteronline.com/groups/v2/groups/{group_id}/memberships"
+
+
+class MembershipCounts:
+    """Fills in `current_size` for rows PCO didn't give a count for.
+
+    This is an N+1 stage: PCO has no bulk source beyond the Group's own
+    memberships_count attribute (which the field map already reads first),
+    so each missing group costs one `per_page=1` memberships request (the
+    count comes from `meta.total_count`). Requests for a page of rows run
+    concurrently through the shared rate-limited PCO client, and results are
+    cached for the rest of the run so no group is asked about twice.
+    """
+
+    def __init__(self, concurrency: int = 1):
+        self.concurrency = max(1, concurrency)
+        self.counts: Dict[str, Optional[int]] = {}
+        self.requests = 0
+        self.pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        get_pco().ensure_pool_size(self.concurrency)
+
+    def _fetch(self, group_id: str) -> Optional[int]:
+        content = get_pco().get_content(MEMBERSHIPS_URL.format(group_id=group_id), params={"per_page": 1})
+        meta = decode_page(content).get("meta", {}) or {}
+        return meta.get("total_count")
+
+    def prefetch(self, group_ids: Iterable[str]) -> None:
+        missing = [g for g in dict.fromkeys(group_ids) if g not in self.counts]
+        if not missing:
+            return
+        for group_id, count in zip(missing, self.pool.map(self._fetch, missing)):
+            self.counts[group_id] = count
+        self.requests += len(missing)
+
+    def fill(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Set `current_size` on rows that don't have one; returns `rows`."""
+        self.prefetch(row["pco_group_id"] for row in rows if row.get("current_size") is None)
+        for row in rows:
+            if row.get("current_size") is None:
+                count = self.counts.get(row["pco_group_id"])
+                if count is not None:
+                    row["current_size"] = count
+                    # The hash (if a worker already set one) is now stale.
+                    row.pop("row_hash", None)
+        return rows
+
+    def close(self) -> None:
+        self.pool.shutdown()
+        print(f"Fetched {len(self.counts)} membership count(s) "
+              f"with {self.requests} request(s)")
+
+
+# --- Migrations ------------------------------------------------------------
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def migrate(directory: str = MIGRATIONS_DIR) -> List[str]:
+    """Apply the migrations in `directory` that haven't run yet, in name order.
+
+    Each file runs in its own transaction together with its row in
+    sync_meta.schema_migrations (outside `public`, so PostgREST doesn't
+    expose it). The files are written to be re-runnable, so a database set
+    up by hand from them before this existed can safely be migrated from
+    scratch. Returns the names applied.
+    """
+    names = sorted(f for f in os.listdir(directory) if f.endswith(".sql"))
+    applied: List[str] = []
+
+    with connect_db() as conn:
+        conn.autocommit = True
+        conn.execute("create schema if not exists sync_meta")
+        conn.execute(
+            "create table if not exists sync_meta.schema_migrations ("
+            "version text primary key, applied_at timestamptz default now())"
+        )
+        done = {row[0] for row in conn.execute("select version from sync_meta.schema_migrations")}
+
+        for name in names:
+            if name in done:
+                continue
+            print(f"Applying migration {name}...")
+            with open(os.path.join(directory, name)) as f:
+                statements = f.read()
+            with conn.transaction():
+                # Two concurrent `migrate` runs queue here instead of both
+                # applying the same file.
+                conn.execute("select pg_advisory_xact_lock(hashtext('sync_meta.schema_migrations'))")
+                if conn.execute(
+                    "select 1 from sync_meta.schema_migrations where version = %s", (name,)
+                ).fetchone():
+                    continue
+                conn.execute(statements)
+                conn.execute("insert into sync_meta.schema_migrations (version) values (%s)", (name,))
+            applied.append(name)
+
+    print(f"Applied {len(applied)} migration(s); "
+          f"{len(names) - len(applied)} already up to date.")
+    return applied
+
+
+# --- Sync modes ------------------------------------------------------------
+
+def resolved_pages(
+    source: Iterable[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield each page's groups with their sideloaded relationships resolved."""
+    index = IncludedIndex()
+    for data, included in source:
+        index.add(included)
+        yield resolve_page(data, index)
+
+
+def sync_all_at_once(
+    concurrency: int = 1,
+    params: Optional[Dict[str, Any]] = None,
+    replace: bool = False,
+    writers: int = 1,
+    workers: int = 1,
+    counts: Optional[MembershipCounts] = None,
+    source: Optional[Iterable[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]] = None,
+    copy: bool = False,
+    swap: bool = False,
+) -> RowDiff:
+    """Original path: fetch every page, transform everything, then write."""
+    data, index = fetch_all_groups(concurrency=concurrency, params=params, pages=source)
+    resolve_page(data, index)
+
+    pages = (data[i: i + PER_PAGE] for i in range(0, len(data), PER_PAGE))
+    rows = [row for chunk in transform_pages(pages, workers=workers) for row in chunk]
+    if counts is not None:
+        counts.fill(rows)
+
+    diff = RowDiff() if replace else RowDiff(*fetch_existing_hashes())
+    rows = diff.filter(rows)
+
+    print(f"Prepared {len(rows)} rows to write to Supabase")
+
+    if swap:
+        swap_rows(rows)
+        return diff
+    if copy:
+        copy_rows(rows, upsert=not replace)
+        return diff
+
+    if replace:
+        # Clear table first
+        clear_groups_table()
+
+    write_rows(rows, upsert=not replace, writers=writers)
+
+    return diff
+
+
+def sync_streaming(
+    concurrency: int = 1,
+    params: Optional[Dict[str, Any]] = None,
+    replace: bool = False,
+    writers: int = 1,
+    workers: int = 1,
+    counts: Optional[MembershipCounts] = None,
+    source: Optional[Iterable[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]] = None,
+    copy: bool = False,
+    swap: bool = False,
+) -> RowDiff:
+    """Transform and write each PCO page as it arrives.
+
+    Only one batch of rows (plus the pages in flight) is held in memory at a
+    time; what grows with the tenant is just the set of group ids seen, which
+    the diff and prune_missing_groups need.
+
+    By default rows are diffed against the stored hashes and only new or
+    changed ones are upserted on pco_group_id; with `replace` the table is
+    cleared first and every row is inserted.
+
+    `source` replaces the PCO walk with another iterator of (groups, included)
+    pages, e.g. `iter_snapshot_pages`. With `copy` the rows are streamed into
+    Postgres with COPY (see copy_rows) instead of PostgREST batches, and with
+    `swap` into a shadow table that replaces public.groups (see swap_rows).
+    """
+    diff = RowDiff() if replace else RowDiff(*fetch_existing_hashes())
+    if source is None:
+        source = iter_group_pages(concurrency=concurrency, params=params)
+    pages = iter(source)
+
+    # Don't clear the table until PCO has answered at least once.
+    first_page = next(pages, None)
+    if first_page is None:
+        return diff
+    if replace and not (copy or swap):
+        # copy_rows and swap_rows replace the table in their own transaction.
+        clear_groups_table()
+
+    raw_pages = resolved_pages(chain([first_page], pages))
+    rows = (
+        row
+        for chunk in transform_pages(raw_pages, workers=workers)
+        for row in diff.filter(counts.fill(chunk) if counts is not None else chunk)
+    )
+    if swap:
+        total = swap_rows(rows)
+    elif copy:
+        total = copy_rows(rows, upsert=not replace)
+    else:
+        total = write_rows(rows, upsert=not replace, writers=writers)
+
+    print(f"Streamed {total} rows into Supabase "
+          f"({pco_connections_opened()} PCO connection(s) opened)")
+    return diff
+
+
+def sync_rpc(
+    concurrency: int = 1,
+    params: Optional[Dict[str, Any]] = None,
+    replace: bool = False,
+    prune: bool = True,
+    workers: int = 1,
+    counts: Optional[MembershipCounts] = None,
+    source: Optional[Iterable[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]] = None,
+) -> RowDiff:
+    """Fetch and transform everything, then apply it with one sync_groups RPC.
+
+    The upsert and the prune (every group PCO didn't return) happen in the
+    same database transaction, so the run either lands in full or not at
+    all. With `replace` every row is sent rather than only changed ones,
+    which leaves the table exactly as a clear-and-insert would.
+    """
+    diff = RowDiff() if replace else RowDiff(*fetch_existing_hashes())
+    if source is None:
+        source = iter_group_pages(concurrency=concurrency, params=params)
+
+    rows = [
+        row
+        for chunk in transform_pages(resolved_pages(source), workers=workers)
+        for row in diff.filter(counts.fill(chunk) if counts is not None else chunk)
+    ]
+
+    if prune and not diff.seen_ids:
+        print("No groups fetched from PCO; skipping prune.")
+        prune = False
+
+    result = call_sync_rpc(rows, keep_ids=sorted(diff.seen_ids) if prune else None)
+    diff.removed = result.get("deleted", 0)
+    return diff
+
+
+def sync_dry_run(
+    source: Iterable[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+    workers: int = 1,
+    counts: Optional[MembershipCounts] = None,
+) -> int:
+    """Fetch and transform every page but write nothing (no Supabase client)."""
+    total = 0
+    for chunk in transform_pages(resolved_pages(source), workers=workers):
+        if counts is not None:
+            counts.fill(chunk)
+        total += len(chunk)
+
+    if counts is not None:
+        counts.close()
+
+    print(f"Dry run: transformed {total} rows; nothing written to Supabase.")
+    return total
+
+
+def sync(
+    concurrency: int = 1,
+    all_at_once: bool = False,
+    incremental: bool = False,
+    replace: bool = False,
+    writers: int = 1,
+    sparse_fields: bool = False,
+    workers: int = 1,
+    include_related: bool = False,
+    membership_counts: bool = False,
+    use_cache: bool = True,
+    save_snapshot: Optional[str] = None,
+    from_snapshot: Optional[str] = None,
+    dry_run: bool = False,
+    copy: bool = False,
+    swap: bool = False,
+    rpc: bool = False,
+    purge_tombstones_days: Optional[int] = None,
+) -> None:
+    if from_snapshot:
+        sync_from_snapshot(
+            from_snapshot, all_at_once=all_at_once, replace=replace,
+            writers=writers, workers=workers,
+            counts=MembershipCounts(concurrency) if membership_counts else None,
+            dry_run=dry_run, copy=copy, swap=swap, rpc=rpc,
+        )
+        return
+
+    if swap:
+        # A swap rebuilds the whole table, so it needs a full pull.
+        incremental = False
+        replace = True
+
+    print("Starting sync from Planning Center to Supabase...")
+
+    pco = get_pco()
+    if use_cache:
+        pco.cache = ResponseCache()
+
+    started_at = datetime.now(timezone.utc)
+    # The watermark lives in Supabase, so a dry run always does a full pull.
+    watermark = load_watermark() if incremental and not dry_run else None
+
+    params: Dict[str, Any] = {}
+    if include_related:
+        params["include"] = ",".join(INCLUDE_RELATED)
+    if sparse_fields:
+        fields = [group_fieldset()]
+        if include_related:
+            # Relationships are fields too; without them nothing links up.
+            fields += INCLUDE_RELATED
+            for relation in INCLUDE_RELATED:
+                params[f"fields[{RELATED_TYPES[relation]}]"] = "name"
+        params["fields[Group]"] = ",".join(fields)
+
+    counts = MembershipCounts(concurrency) if membership_counts else None
+
+    if incremental and watermark:
+        print(f"Incremental sync: groups updated since {watermark}")
+        params["where[updated_at][gte]"] = watermark
+
+    source = None
+    if save_snapshot:
+        source = iter_group_pages(
+            concurrency=concurrency, params=params,
+            snapshot=SnapshotWriter(save_snapshot, params),
+        )
+
+    if dry_run:
+        sync_dry_run(
+            source or iter_group_pages(concurrency=concurrency, params=params),
+            workers=workers, counts=counts,
+        )
+        return
+
+    if rpc:
+        full = not (incremental and watermark)
+        if incremental and not watermark:
+            print("No watermark saved yet; running a full sync instead.")
+        diff = sync_rpc(
+            concurrency=concurrency, params=params, replace=replace and full,
+            prune=full, workers=workers, counts=counts, source=source,
+        )
+    elif incremental and watermark:
+        diff = sync_streaming(
+            concurrency=concurrency, params=params, writers=writers, workers=workers,
+            counts=counts, source=source, copy=copy,
+        )
+    else:
+        if incremental:
+            print("No watermark saved yet; running a full sync instead.")
+        if all_at_once:
+            diff = sync_all_at_once(
+                concurrency=concurrency, params=params, replace=replace,
+                writers=writers, workers=workers, counts=counts, source=source,
+                copy=copy, swap=swap,
+            )
         else:
-            print("Batch inserted successfully")
+            diff = sync_streaming(
+                concurrency=concurrency, params=params, replace=replace,
+                writers=writers, workers=workers, counts=counts, source=source,
+                copy=copy, swap=swap,
+            )
+
+        # Upserts leave groups that were removed from PCO behind.
+        if not replace:
+            prune_missing_groups(diff)
+
+    if counts is not None:
+        counts.close()
+
+    if pco.cache is not None:
+        print(f"HTTP cache: {pco.cache.hits} page(s) not modified, "
+              f"{pco.cache.bytes_saved} bytes not re-downloaded")
+
+    print(f"Row changes: {diff.summary()}")
+
+    if purge_tombstones_days is not None:
+        purge_tombstones(purge_tombstones_days)
+
+    save_watermark(started_at)
+
+    print("Sync complete.")
+
+
+def sync_from_snapshot(
+    directory: str,
+    all_at_once: bool = False,
+    replace: bool = False,
+    writers: int = 1,
+    workers: int = 1,
+    counts: Optional[MembershipCounts] = None,
+    dry_run: bool = False,
+    copy: bool = False,
+    swap: bool = False,
+    rpc: bool = False,
+) -> None:
+    """Re-run the transform and write over a saved snapshot, without PCO.
+
+    The watermark is left alone: the snapshot says nothing about what changed
+    in PCO since it was taken.
+    """
+    print(f"Starting sync from snapshot {directory} to Supabase...")
+
+    manifest = load_snapshot_manifest(directory)
+    # A snapshot of an incremental pull only holds the groups that changed.
+    partial = "where[updated_at][gte]" in (manifest.get("params") or {})
+    if partial and (replace or swap):
+        print("Snapshot is of an incremental pull; upserting instead of replacing.")
+        replace = swap = False
+    if swap:
+        replace = True
+
+    source = iter_snapshot_pages(directory)
+    if dry_run:
+        sync_dry_run(source, workers=workers, counts=counts)
+        return
+
+    if rpc:
+        diff = sync_rpc(
+            replace=replace, prune=not partial, workers=workers, counts=counts,
+            source=source,
+        )
+    elif all_at_once:
+        diff = sync_all_at_once(
+            replace=replace, writers=writers, workers=workers, counts=counts,
+            source=source, copy=copy, swap=swap,
+        )
+    else:
+        diff = sync_streaming(
+            replace=replace, writers=writers, workers=workers,
+            counts=counts, source=source, copy=copy, swap=swap,
+        )
+
+    if not replace and not partial and not rpc:
+        prune_missing_groups(diff)
+
+    if counts is not None:
+        counts.close()
 
+    print(f"Row changes: {diff.summary()}")
     print("Sync complete.")
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sync PCO groups into Supabase.")
+    commands = parser.add_subparsers(dest="command", metavar="{migrate}")
+    migrate_parser = commands.add_parser(
+        "migrate",
+        help="Apply new SQL migrations to the database ($SUPABASE_DB_URL) and exit.",
+    )
+    migrate_parser.add_argument(
+        "--dir",
+        default=MIGRATIONS_DIR,
+        help="Directory of NNNN_name.sql migrations (default: migrations/ "
+             "next to this script).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of PCO pages to fetch in parallel (default: 1).",
+    )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=1,
+        help="Number of Supabase write batches to keep in flight (default: 1).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes transforming groups (default: 1, in-process).",
+    )
+    parser.add_argument(
+        "--all-at-once",
+        action="store_true",
+        help="Fetch and transform every group before writing, instead of "
+             "streaming pages into Supabase as they arrive.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch and upsert groups updated since the last run. "
+             "Falls back to a full sync when no watermark is saved yet.",
+    )
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Full syncs clear the table and re-insert every row instead of "
+             "upserting and pruning removed groups.",
+    )
+    parser.add_argument(
+        "--sparse-fields",
+        action="store_true",
+        help="Ask PCO for only the Group attributes transform_group reads "
+             "(JSON:API fields[Group]=...).",
+    )
+    parser.add_argument(
+        "--include-related",
+        action="store_true",
+        help="Sideload each group's type, location and tags (include=...) "
+             "to fill group_type, campus and tags.",
+    )
+    parser.add_argument(
+        "--membership-counts",
+        action="store_true",
+        help="Look up membership counts for groups whose attributes don't "
+             "include one. PCO has no bulk endpoint for this, so it costs one "
+             "extra request per such group (N+1), under the same rate limit: "
+             "1,000 groups without a memberships_count add about 1,000 "
+             "requests, over 3 minutes at 100 per 20 seconds.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or write the on-disk PCO response cache.",
+    )
+    parser.add_argument(
+        "--save-snapshot",
+        metavar="DIR",
+        help="Also save every raw PCO page to a compressed snapshot in DIR.",
+    )
+    parser.add_argument(
+        "--from-snapshot",
+        metavar="DIR",
+        help="Replay a snapshot saved with --save-snapshot instead of "
+             "pulling from PCO (the watermark is not touched).",
+    )
+    write_mode = parser.add_mutually_exclusive_group()
+    write_mode.add_argument(
+        "--rpc",
+        action="store_true",
+        help="Apply the whole run (upserts and prune) with one call to the "
+             "sync_groups database function, in a single transaction.",
+    )
+    write_mode.add_argument(
+        "--copy",
+        action="store_true",
+        help="Write rows with Postgres COPY over a direct connection "
+             "($SUPABASE_DB_URL, needs psycopg) instead of PostgREST batches.",
+    )
+    write_mode.add_argument(
+        "--swap",
+        action="store_true",
+        help="Full sync into a shadow table (public.groups_next) and rename it "
+             "over public.groups in one transaction ($SUPABASE_DB_URL, needs "
+             "psycopg). Implies --replace; ignores --incremental.",
+    )
+    parser.add_argument(
+        "--purge-tombstones",
+        type=int,
+        metavar="DAYS",
+        help="After syncing, hard-delete groups tombstoned more than DAYS days ago.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Fetch (or replay) and transform every group, but don't connect "
+             "to or write anything in Supabase.",
+    )
+    parser.add_argument(
+        "--field-map",
+        default=os.environ.get("GROUP_FIELD_MAP"),
+        help="JSON file of {column: [attribute, ...]} overriding which PCO "
+             "attributes feed each column (default: $GROUP_FIELD_MAP).",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    sync()
+    args = parse_args()
+    if args.command == "migrate":
+        migrate(args.dir)
+    else:
+        if args.field_map:
+            set_field_map(load_field_map(args.field_map))
+        sync(
+            concurrency=args.concurrency,
+            all_at_once=args.all_at_once,
+            incremental=args.incremental,
+            replace=args.replace,
+            writers=args.writers,
+            sparse_fields=args.sparse_fields,
+            workers=args.workers,
+            include_related=args.include_related,
+            membership_counts=args.membership_counts,
+            use_cache=not args.no_cache,
+            save_snapshot=args.save_snapshot,
+            from_snapshot=args.from_snapshot,
+            dry_run=args.dry_run,
+            copy=args.copy,
+            swap=args.swap,
+            rpc=args.rpc,
+            purge_tombstones_days=args.purge_tombstones,
+        )
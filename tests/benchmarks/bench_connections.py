@@ -0,0 +1,50 @@
+"""Connections opened per pull: pooled PCOClient vs. a fresh request per page.
+
+    python -m pytest -m benchmark tests/benchmarks/bench_connections.py -s
+"""
+
+import time
+
+import pytest
+import requests
+
+import sync_groups
+from fakes import make_groups
+
+GROUPS = 2_000
+
+
+def unpooled_pull(server) -> int:
+    """The pre-pooling fetch loop: module-level requests.get per page."""
+    url, params = server.groups_url, {"per_page": sync_groups.PER_PAGE}
+    while url:
+        body = requests.get(url, params=params, timeout=10).json()
+        params = None
+        url = (body.get("links") or {}).get("next")
+    return server.connections
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def bench_connections_per_pull(make_pco, concurrency):
+    server = make_pco(make_groups(GROUPS))
+    pages = -(-GROUPS // sync_groups.PER_PAGE)
+
+    started = time.perf_counter()
+    groups, _ = sync_groups.fetch_all_groups(concurrency=concurrency)
+    pooled_seconds = time.perf_counter() - started
+    pooled = server.connections
+    assert sync_groups.pco_connections_opened() == pooled
+
+    baseline_server = make_pco(make_groups(GROUPS))
+    started = time.perf_counter()
+    unpooled = unpooled_pull(baseline_server)
+    unpooled_seconds = time.perf_counter() - started
+
+    print(f"\n{pages} pages, concurrency {concurrency}: pooled client opened "
+          f"{pooled} connection(s) in {pooled_seconds:.2f}s; requests.get opened "
+          f"{unpooled} in {unpooled_seconds:.2f}s")
+
+    assert len(groups) == GROUPS
+    # One connection per worker thread at most, however many pages.
+    assert pooled <= concurrency
+    assert unpooled == pages
@@ -0,0 +1,69 @@
+"""--copy vs. batched inserts, against a real Postgres.
+
+Needs SUPABASE_DB_URL pointing at a scratch database (local Postgres is
+fine; the migrations are applied first) and replaces public.groups there.
+
+The baseline sends each batch the way PostgREST runs a bulk insert or
+upsert: one jsonb_populate_recordset statement per request, each its own
+transaction. It skips the HTTP round trips PostgREST adds, so the gap shown
+here is a lower bound.
+
+    SUPABASE_DB_URL=postgresql://localhost/sync_bench \\
+        python -m pytest -m benchmark tests/benchmarks/bench_copy.py -s
+"""
+
+import contextlib
+import io
+import time
+
+import sync_groups
+from fakes import make_groups
+
+ROWS = 20_000
+
+
+def batched_insert(pg, rows, upsert: bool) -> None:
+    from psycopg.types.json import Jsonb
+
+    columns = ", ".join(sync_groups.COPY_COLUMNS)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in sync_groups.COPY_COLUMNS if c != "pco_group_id")
+    conflict = f" on conflict (pco_group_id) do update set {updates}" if upsert else ""
+    with pg.cursor() as cur:
+        if not upsert:
+            cur.execute("delete from public.groups")
+        for i in range(0, len(rows), sync_groups.BATCH_SIZE):
+            cur.execute(
+                f"insert into public.groups ({columns}) select {columns} "
+                f"from jsonb_populate_recordset(null::public.groups, %s){conflict}",
+                [Jsonb(rows[i:i + sync_groups.BATCH_SIZE])],
+            )
+
+
+def timed(fn, *args, **kwargs) -> float:
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args, **kwargs)
+    return time.perf_counter() - started
+
+
+def bench_copy_vs_insert(pg):
+    rows = [sync_groups.transform_group(g) for g in make_groups(ROWS)]
+    for row in rows:
+        row["row_hash"] = sync_groups.compute_row_hash(row)
+        row["deleted_at"] = None
+
+    results = {}
+    for upsert in (False, True):
+        mode = "upsert" if upsert else "replace"
+        results[mode, "insert"] = timed(batched_insert, pg, rows, upsert)
+        results[mode, "copy"] = timed(sync_groups.copy_rows, rows, upsert=upsert)
+        with pg.cursor() as cur:
+            cur.execute("select count(*) from public.groups")
+            assert cur.fetchone()[0] == ROWS
+
+    for (mode, how), seconds in results.items():
+        print(f"\n{mode:>7} {how:>6}: {seconds:6.2f}s ({ROWS / seconds:8.0f} rows/s)", end="")
+    print()
+
+    assert results["replace", "copy"] < results["replace", "insert"]
+    assert results["upsert", "copy"] < results["upsert", "insert"]
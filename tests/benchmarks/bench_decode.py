@@ -0,0 +1,62 @@
+"""Page decode time: msgspec vs. orjson vs. json.loads on the same bodies.
+
+decode_page picks the first of these that's installed. Each run decodes and
+transforms the same pages, since msgspec skips the attributes
+transform_group never reads but then has to rebuild the dicts it returns.
+The stub's groups carry the real API's unused attributes (see
+bench_sparse_fields), so the bodies are PCO-sized.
+
+    python -m pytest -m benchmark tests/benchmarks/bench_decode.py -s
+"""
+
+import json
+import time
+
+import pytest
+
+import sync_groups
+from bench_sparse_fields import UNUSED_ATTRIBUTES
+from fakes import make_group
+
+GROUPS = 10_000
+ROUNDS = 5
+
+
+def pages():
+    groups = [make_group(i, **UNUSED_ATTRIBUTES) for i in range(GROUPS)]
+    per_page = sync_groups.PER_PAGE
+    return [
+        json.dumps({"data": groups[i:i + per_page], "included": [], "links": {},
+                    "meta": {"count": per_page}}).encode()
+        for i in range(0, GROUPS, per_page)
+    ]
+
+
+def seconds_per_round(monkeypatch, bodies, decoder: str) -> float:
+    with monkeypatch.context() as patch:
+        for module in ("msgspec", "orjson"):
+            if module != decoder:
+                patch.setattr(sync_groups, module, None)
+        best = float("inf")
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            rows = [sync_groups.transform_group(g)
+                    for body in bodies for g in sync_groups.decode_page(body)["data"]]
+            best = min(best, time.perf_counter() - started)
+    assert len(rows) == GROUPS
+    return best
+
+
+def bench_decoders(monkeypatch):
+    if sync_groups.msgspec is None or sync_groups.orjson is None:
+        pytest.skip("needs both msgspec and orjson installed")
+    bodies = pages()
+    results = {name: seconds_per_round(monkeypatch, bodies, name) for name in ("msgspec", "orjson", "json")}
+
+    size = sum(len(body) for body in bodies)
+    print(f"\n{len(bodies)} pages, {size / 1e6:.1f} MB, decoded and transformed (best of {ROUNDS}):")
+    for name, seconds in results.items():
+        print(f"{name:>8}: {seconds * 1000:7.1f} ms ({results['json'] / seconds:.2f}x json.loads)")
+
+    assert results["msgspec"] < results["json"]
+    assert results["orjson"] < results["json"]
@@ -0,0 +1,77 @@
+"""Start-up cost, from `python -X importtime`.
+
+supabase (and the postgrest/httpx stack under it) is imported lazily, so
+importing the script, printing --help or dry-running a snapshot should never
+pay for it.
+
+    python -m pytest -m benchmark tests/benchmarks/bench_import_time.py -s
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+import sync_groups
+from fakes import make_groups
+
+SCRIPT = sync_groups.__file__
+LAZY = ("supabase", "postgrest", "httpx", "psycopg")
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+class ImportTimes:
+    """Run Python with -X importtime and keep each module's cumulative µs."""
+
+    def __init__(self, *args: str):
+        env = {**os.environ, "PYTHONPATH": os.path.dirname(SCRIPT)}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            capture_output=True, text=True, env=env, check=True,
+        )
+        self.stdout = result.stdout
+        self.modules: Dict[str, int] = {}
+        self.top_level_us = 0
+        for line in result.stderr.splitlines():
+            match = LINE.match(line)
+            if match:
+                self.modules[match.group(4)] = int(match.group(2))
+                if not match.group(3):
+                    self.top_level_us += int(match.group(2))
+
+    def lazy(self) -> List[str]:
+        """Deferred packages this run imported anyway."""
+        return sorted({name.split(".")[0] for name in self.modules} & set(LAZY))
+
+
+def write_snapshot(directory: str) -> None:
+    writer = sync_groups.SnapshotWriter(directory)
+    groups = make_groups(500)
+    for i in range(0, len(groups), 100):
+        page = {"data": groups[i:i + 100], "included": [], "links": {}, "meta": {}}
+        writer.write_page(json.dumps(page).encode(), 100)
+    writer.close()
+
+
+def bench_import_time(tmp_path):
+    write_snapshot(str(tmp_path / "snapshot"))
+    supabase_us = ImportTimes("-c", "import supabase").modules["supabase"]
+    runs = {
+        "import sync_groups": ImportTimes("-c", "import sync_groups"),
+        "--help": ImportTimes(SCRIPT, "--help"),
+        "--from-snapshot --dry-run": ImportTimes(
+            SCRIPT, "--from-snapshot", str(tmp_path / "snapshot"), "--dry-run"),
+    }
+    module_us = runs["import sync_groups"].modules["sync_groups"]
+
+    print(f"\nimport sync_groups: {module_us / 1000:6.1f} ms cumulative")
+    print(f"import supabase:    {supabase_us / 1000:6.1f} ms cumulative (deferred)")
+    for name, run in runs.items():
+        print(f"{name}: {run.top_level_us / 1000:.1f} ms in imports")
+
+    for name, run in runs.items():
+        assert not run.lazy(), f"{name} imported {run.lazy()}"
+    assert "500" in runs["--from-snapshot --dry-run"].stdout
+    assert module_us < supabase_us
@@ -0,0 +1,37 @@
+"""PCO requests per sync with --membership-counts, as the tenant grows.
+
+Half the stub's groups have no memberships_count, so each of those costs one
+memberships request on top of the group pages: the stage is N+1 in the
+number of groups missing a count, and this shows it.
+
+    python -m pytest -m benchmark tests/benchmarks/bench_membership_requests.py -s
+"""
+
+import contextlib
+import io
+
+import sync_groups
+from fakes import make_group
+
+
+def bench_membership_requests_by_group_count(make_pco, supabase):
+    for total in (200, 400, 800):
+        # Some of the counted groups are empty: a count of 0 needs no lookup.
+        groups = [make_group(i, memberships_count=None if i % 2 else i % 13) for i in range(total)]
+        missing = {g["id"] for g in groups if g["attributes"]["memberships_count"] is None}
+        server = make_pco(groups, memberships={group_id: 5 for group_id in missing})
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_groups.sync(concurrency=4, use_cache=False, membership_counts=True)
+
+        pages = -(-total // sync_groups.PER_PAGE)
+        lookups = sum("/memberships" in path for path in server.paths)
+        print(f"\n{total:>4} groups, {len(missing):>3} without a count: "
+              f"{server.requests:>4} requests ({pages} pages + {lookups} membership lookups)", end="")
+
+        assert lookups == len(missing)
+        assert any(g["attributes"]["memberships_count"] == 0 for g in groups)
+        assert server.requests == pages + len(missing)
+        assert all(row["current_size"] == 5 for row in supabase.tables["groups"].values()
+                   if row["pco_group_id"] in missing)
+    print()
@@ -0,0 +1,80 @@
+"""Bytes transferred and parse time with and without --sparse-fields.
+
+The stub's groups carry the attributes the real Groups API sends that the
+sync never reads, so the full responses are about as heavy as PCO's.
+
+    python -m pytest -m benchmark tests/benchmarks/bench_sparse_fields.py -s
+"""
+
+import time
+
+import sync_groups
+from fakes import make_group
+
+GROUPS = 5_000
+ROUNDS = 5
+
+# Attributes real PCO groups carry that transform_group doesn't use.
+UNUSED_ATTRIBUTES = {
+    "header_image": {
+        "thumbnail": "https://groups-production.s3.amazonaws.com/uploads/group/header_image/1/thumbnail.jpg",
+        "medium": "https://groups-production.s3.amazonaws.com/uploads/group/header_image/1/medium.jpg",
+        "original": "https://groups-production.s3.amazonaws.com/uploads/group/header_image/1/original.jpg",
+    },
+    "events_visibility": "members",
+    "location_type_preference": "physical",
+    "virtual_location_url": None,
+    "can_create_conversation": False,
+    "chat_enabled": True,
+    "members_can_create_forum_topics": False,
+    "leaders_can_search_people_database": False,
+    "enrollment_strategy": "request_to_join",
+    "enrollment_open": True,
+    "widget_status": {},
+    "listed": True,
+}
+
+
+def pull(server, params):
+    """Fetch every page; return the raw bodies."""
+    pco = sync_groups.get_pco()
+    bodies, url = [], server.groups_url
+    params = {"per_page": sync_groups.PER_PAGE, "order": sync_groups.PAGE_ORDER, **params}
+    while url:
+        body = pco.get_content(url, params=params)
+        bodies.append(body)
+        params = None
+        url = sync_groups._next_page_url(sync_groups.decode_page(body))
+    return bodies
+
+
+def parse_seconds(bodies) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for body in bodies:
+            sync_groups.decode_page(body)
+    return (time.perf_counter() - started) / ROUNDS
+
+
+def bench_sparse_fields(make_pco):
+    groups = [make_group(i, **UNUSED_ATTRIBUTES) for i in range(GROUPS)]
+    results = {}
+    for sparse in (False, True):
+        server = make_pco(groups)
+        params = {"fields[Group]": sync_groups.group_fieldset()} if sparse else {}
+        bodies = pull(server, params)
+        rows = [
+            sync_groups.transform_group(g)
+            for body in bodies for g in sync_groups.decode_page(body)["data"]
+        ]
+        results[sparse] = (server.bytes_sent, parse_seconds(bodies), rows)
+
+    for sparse, (sent, seconds, _rows) in results.items():
+        label = "sparse fields" if sparse else "full groups  "
+        print(f"\n{label}: {sent / 1e6:6.2f} MB sent, {seconds * 1000:6.1f} ms to parse", end="")
+    print()
+
+    full, sparse = results[False], results[True]
+    assert sparse[2] == full[2]  # same rows either way
+    assert sparse[0] < full[0] * 0.6
+    assert sparse[1] < full[1]
@@ -0,0 +1,44 @@
+"""Transform + hash throughput vs. --workers.
+
+Feeds in-memory pages through transform_pages and RowDiff.filter, the CPU
+part of a sync, with 1, 2, 4 and 8 worker processes (4 and 8 only with
+that many cores). Pool start-up is included, as it is in a real run. On a
+single-core machine the numbers are printed and the scaling check skipped.
+
+    python -m pytest -m benchmark tests/benchmarks/bench_workers.py -s
+"""
+
+import os
+import time
+
+import pytest
+
+import sync_groups
+from fakes import make_groups
+
+GROUPS = 50_000
+
+
+def rows_per_second(pages, workers: int) -> float:
+    started = time.perf_counter()
+    diff = sync_groups.RowDiff()
+    written = sum(len(diff.filter(rows)) for rows in sync_groups.transform_pages(pages, workers=workers))
+    seconds = time.perf_counter() - started
+    assert written == GROUPS
+    return GROUPS / seconds
+
+
+def bench_transform_scaling_by_workers():
+    groups = make_groups(GROUPS)
+    pages = [groups[i:i + sync_groups.PER_PAGE] for i in range(0, GROUPS, sync_groups.PER_PAGE)]
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+    counts = [1, 2] + [n for n in (4, 8) if n <= cores]
+    throughput = {n: rows_per_second(pages, n) for n in counts}
+    for n, rate in throughput.items():
+        print(f"\n{n} worker(s): {rate:8.0f} rows/s ({rate / throughput[1]:.2f}x)", end="")
+    print(f"\n{cores} core(s) available")
+
+    if cores < 2:
+        pytest.skip("only one core: worker scaling can't be measured here")
+    assert throughput[2] > throughput[1] * 1.4
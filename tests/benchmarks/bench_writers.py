@@ -0,0 +1,51 @@
+"""Write throughput vs. --writers against a stub Supabase.
+
+Every write takes WRITE_LATENCY and the stub serves CAPACITY writes at once,
+so throughput should rise with the writer count up to CAPACITY and then
+level off.
+
+    python -m pytest -m benchmark tests/benchmarks/bench_writers.py -s
+"""
+
+import contextlib
+import functools
+import io
+import time
+
+import sync_groups
+from fakes import FakeSupabase, make_groups
+
+ROWS = 4_000
+BATCH = 100
+WRITE_LATENCY = 0.02
+CAPACITY = 4
+
+
+def rows_per_second(monkeypatch, rows, writers: int) -> float:
+    db = FakeSupabase(latency=WRITE_LATENCY, capacity=CAPACITY, keep_rows=False)
+    monkeypatch.setattr(sync_groups, "get_supabase", lambda: db)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        written = sync_groups.write_rows(rows, upsert=True, writers=writers)
+    seconds = time.perf_counter() - started
+
+    assert written == db.rows_written["groups"] == len(rows)
+    return written / seconds
+
+
+def bench_write_throughput_by_writers(monkeypatch):
+    # Fixed batches, so only the writer count changes between runs.
+    monkeypatch.setattr(sync_groups, "AdaptiveBatcher", functools.partial(
+        sync_groups.AdaptiveBatcher, initial_rows=BATCH, min_rows=BATCH, max_rows=BATCH))
+    rows = [sync_groups.transform_group(g) for g in make_groups(ROWS)]
+
+    throughput = {n: rows_per_second(monkeypatch, rows, n) for n in (1, 2, 4, 8)}
+    for n, rate in throughput.items():
+        print(f"\n{n} writer(s): {rate:8.0f} rows/s ({rate / throughput[1]:.1f}x)", end="")
+    print()
+
+    assert throughput[2] > throughput[1] * 1.6
+    assert throughput[4] > throughput[1] * 2.8
+    # Past the server's capacity more writers only queue.
+    assert throughput[8] < throughput[4] * 1.3
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import sync_groups
+from fakes import FakePCO, FakeSupabase, make_groups
+
+BENCHMARKS = os.path.join(os.path.dirname(__file__), "benchmarks")
+
+
+def pytest_collection_modifyitems(items):
+    """Mark everything under tests/benchmarks; pytest.ini deselects them by default."""
+    for item in items:
+        if str(item.path).startswith(BENCHMARKS + os.sep):
+            item.add_marker(pytest.mark.benchmark)
+
+
+@pytest.fixture(autouse=True)
+def isolated_sync(monkeypatch, tmp_path):
+    """Fresh clients, retry budget and field map for every test."""
+    monkeypatch.setenv("PCO_APP_ID", "app")
+    monkeypatch.setenv("PCO_SECRET", "secret")
+    # The response cache and snapshots default to paths under the cwd.
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sync_groups, "retry_policy", sync_groups.RetryPolicy(base_delay=0.01, max_delay=0.05))
+    sync_groups.get_pco.cache_clear()
+    yield
+    sync_groups.get_pco.cache_clear()
+    sync_groups.set_field_map(dict(sync_groups.DEFAULT_FIELD_MAP))
+
+
+@pytest.fixture
+def make_pco(monkeypatch):
+    """Start a FakePCO and point the sync at it."""
+    servers = []
+
+    def start(groups=None, **kwargs):
+        server = FakePCO(make_groups(537) if groups is None else groups, **kwargs).start()
+        servers.append(server)
+        monkeypatch.setattr(sync_groups, "BASE_URL", server.groups_url)
+        monkeypatch.setattr(sync_groups, "MEMBERSHIPS_URL", server.memberships_url)
+        sync_groups.get_pco.cache_clear()
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def pco(make_pco):
+    return make_pco()
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(sync_groups, "get_supabase", lambda: db)
+    return db
+
+
+@pytest.fixture
+def pg():
+    """An autocommit connection to SUPABASE_DB_URL, migrated; skipped without one.
+
+    Point it at a scratch database: tests replace what's in public.groups.
+    """
+    if not os.environ.get("SUPABASE_DB_URL"):
+        pytest.skip("SUPABASE_DB_URL is not set")
+    sync_groups.migrate()
+    conn = sync_groups.connect_db()
+    conn.autocommit = True
+    yield conn
+    conn.close()
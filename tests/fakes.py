@@ -0,0 +1,465 @@
+"""In-process stand-ins for the PCO API and the Supabase client.
+
+FakePCO is a real HTTP server on localhost (so connection pooling, gzip,
+rate-limit headers and 429s go through `requests` exactly as in production);
+FakeSupabase mimics the bits of the supabase-py query builder the sync uses.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def make_group(i: int, **attributes: Any) -> Dict[str, Any]:
+    """A PCO Group resource shaped like the real API's."""
+    attrs = {
+        "name": f"Group {i}",
+        "description": f"<p>Description for group {i}</p>",
+        "meeting_day": ["Monday", "Tuesday", "Wednesday"][i % 3],
+        "archived_at": None if i % 7 else "2023-01-01T00:00:00Z",
+        "created_at": f"2020-01-01T00:00:{i % 60:02d}Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "memberships_count": i % 13,
+        "public_church_center_web_url": f"https://example.churchcenter.com/groups/{i}",
+        "schedule": "Weekly",
+        "contact_email": f"leader{i}@example.com",
+    }
+    attrs.update(attributes)
+    return {
+        "type": "Group",
+        "id": str(i),
+        "attributes": attrs,
+        "relationships": {
+            "group_type": {"data": {"type": "GroupType", "id": str(i % 3)}},
+            "location": {"data": None},
+        },
+        "links": {"self": f"https://api.planningcenteronline.com/groups/v2/groups/{i}"},
+    }
+
+
+def make_groups(n: int, start: int = 0) -> List[Dict[str, Any]]:
+    return [make_group(i) for i in range(start, start + n)]
+
+
+def make_resource(type_: str, id_: str, name: str) -> Dict[str, Any]:
+    """A sideloadable resource (GroupType, Location, Tag) with just a name."""
+    return {"type": type_, "id": id_, "attributes": {"name": name}}
+
+
+class FakePCO:
+    """Serves `groups` (and per-group memberships) like PCO's Groups API.
+
+    * `rate_limit`/`rate_period` are advertised in the X-PCO-API-Request-Rate-*
+      headers and enforced over a sliding window; over the limit the server
+      answers 429 with a Retry-After.
+    * `on_request(server, path)` runs before each request is answered, e.g.
+      to add groups part way through a pull.
+    * `latency` adds a per-request delay (seconds).
+    * `where[updated_at][gte]` filters groups as PCO does, so incremental
+      pulls only see what changed.
+    * With `include=...`, the `included` resources each page's groups link
+      to are sideloaded. Like PCO, a page lists each once, but the same
+      resource comes back on every page that refers to it.
+    * With `etags`, responses carry an ETag and a request whose
+      If-None-Match still matches gets an empty 304 (counted in
+      `not_modified`).
+    """
+
+    def __init__(
+        self,
+        groups: Optional[List[Dict[str, Any]]] = None,
+        rate_limit: int = 100_000,
+        rate_period: float = 20.0,
+        latency: float = 0.0,
+        memberships: Optional[Dict[str, int]] = None,
+        included: Optional[List[Dict[str, Any]]] = None,
+        etags: bool = False,
+    ):
+        self.groups = list(groups or [])
+        self.included = {(r["type"], r["id"]): r for r in included or []}
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.latency = latency
+        self.memberships = memberships or {}
+        self.etags = etags
+        self.on_request: Optional[Callable[["FakePCO", str], None]] = None
+
+        self.lock = threading.Lock()
+        self._sorted: Optional[List[Dict[str, Any]]] = None
+        self._sorted_key: Optional[tuple] = None
+        self.requests = 0
+        self.throttled = 0
+        self.connections = 0
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self.paths: List[str] = []
+        self.window: Deque[float] = deque()
+        self.max_in_window = 0
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this,
+            # Nagle + delayed ACKs add ~40ms to every keep-alive request.
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                with fake.lock:
+                    fake.connections += 1
+                super().setup()
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                fake._handle(self)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    @property
+    def groups_url(self) -> str:
+        return f"{self.url}/groups/v2/groups"
+
+    @property
+    def memberships_url(self) -> str:
+        return self.groups_url + "/{group_id}/memberships"
+
+    def start(self) -> "FakePCO":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def preload_window(self, count: int) -> None:
+        """Pretend `count` requests were made (by someone else) just now."""
+        now = time.monotonic()
+        with self.lock:
+            self.window.extend([now] * count)
+
+    def _admit(self) -> Optional[float]:
+        """Record a request; return a Retry-After if it's over the limit."""
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            horizon = now - self.rate_period
+            while self.window and self.window[0] <= horizon:
+                self.window.popleft()
+            if len(self.window) >= self.rate_limit:
+                self.throttled += 1
+                return self.window[0] + self.rate_period - now
+            self.window.append(now)
+            self.max_in_window = max(self.max_in_window, len(self.window))
+            return None
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        url = urlparse(handler.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        with self.lock:
+            self.paths.append(handler.path)
+        if self.on_request is not None:
+            self.on_request(self, handler.path)
+        if self.latency:
+            time.sleep(self.latency)
+
+        retry_after = self._admit()
+        headers = {
+            "X-PCO-API-Request-Rate-Limit": str(self.rate_limit),
+            "X-PCO-API-Request-Rate-Period": str(int(self.rate_period) or self.rate_period),
+            "X-PCO-API-Request-Rate-Count": str(len(self.window)),
+        }
+        if retry_after is not None:
+            headers["Retry-After"] = f"{max(retry_after, 0.01):.3f}"
+            self._send(handler, 429, {"errors": [{"status": "429"}]}, headers)
+            return
+
+        if url.path.endswith("/memberships"):
+            group_id = url.path.rstrip("/").split("/")[-2]
+            count = self.memberships.get(group_id, 0)
+            body = {"data": [], "meta": {"total_count": count, "count": min(count, 1)}}
+            self._send(handler, 200, body, headers)
+            return
+
+        self._send(handler, 200, self._page(query), headers)
+
+    def _ordered(self, groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Re-sorting a large tenant for every page makes big pulls quadratic.
+        # Tests add groups in place or assign a new list, so sort again when
+        # either the list or its length changes.
+        key = (id(groups), len(groups))
+        if self._sorted is None or self._sorted_key != key:
+            self._sorted = sorted(
+                groups, key=lambda g: (g["attributes"].get("created_at") or "", int(g["id"])))
+            self._sorted_key = key
+        return self._sorted
+
+    def _page(self, query: Dict[str, str]) -> Dict[str, Any]:
+        per_page = int(query.get("per_page", "25"))
+        offset = int(query.get("offset", "0"))
+        with self.lock:
+            groups = self._ordered(self.groups) if query.get("order") == "created_at" else self.groups
+            since = query.get("where[updated_at][gte]")
+            if since:
+                groups = [g for g in groups if (g["attributes"].get("updated_at") or "") >= since]
+            total = len(groups)
+            data = groups[offset: offset + per_page]
+
+        fields = query.get("fields[Group]")
+        if fields:
+            keep = set(fields.split(","))
+            data = [
+                {**g, "attributes": {k: v for k, v in g["attributes"].items() if k in keep}}
+                for g in data
+            ]
+
+        included: Dict[tuple, Dict[str, Any]] = {}
+        for relation in filter(None, query.get("include", "").split(",")):
+            for group in data:
+                linkage = ((group.get("relationships") or {}).get(relation) or {}).get("data")
+                for ref in linkage if isinstance(linkage, list) else [linkage] if linkage else []:
+                    key = (ref["type"], ref["id"])
+                    if key in self.included:
+                        included.setdefault(key, self.included[key])
+
+        page: Dict[str, Any] = {
+            "data": data,
+            "included": list(included.values()),
+            "links": {},
+            "meta": {"total_count": total, "count": len(data)},
+        }
+        if offset + per_page < total:
+            next_query = {**query, "offset": str(offset + per_page)}
+            page["links"]["next"] = (
+                f"{self.groups_url}?" + "&".join(f"{k}={v}" for k, v in next_query.items())
+            )
+        return page
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, body: Dict[str, Any],
+              headers: Dict[str, str]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        if self.etags and status == 200:
+            headers = {**headers, "ETag": f'"{hashlib.sha256(payload).hexdigest()[:16]}"'}
+            if handler.headers.get("If-None-Match") == headers["ETag"]:
+                status, payload = 304, b""
+                with self.lock:
+                    self.not_modified += 1
+        with self.lock:
+            self.bytes_sent += len(payload)
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+
+class FakeAPIError(Exception):
+    """Shaped like postgrest's APIError: a `code` plus a message."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class FakeResponse:
+    def __init__(self, data: Any):
+        self.data = data
+        self.error = None
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.payload: Any = None
+        self.columns: Optional[List[str]] = None
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.bounds: Optional[tuple] = None
+
+    # Writes
+    def insert(self, rows: Any) -> "FakeQuery":
+        self.op, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows: Any, on_conflict: str = "", **kwargs: Any) -> "FakeQuery":
+        self.op, self.payload = "upsert", rows
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "FakeQuery":
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self.op = "delete"
+        return self
+
+    def select(self, columns: str = "*", **kwargs: Any) -> "FakeQuery":
+        self.op = "select"
+        self.columns = None if columns == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    # Filters
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def neq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda r: r.get(column) != value)
+        return self
+
+    def lt(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) < value)
+        return self
+
+    def is_(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda r: r.get(column) is None)
+        return self
+
+    def in_(self, column: str, values: Any) -> "FakeQuery":
+        wanted = set(values)
+        self.filters.append(lambda r: r.get(column) in wanted)
+        return self
+
+    def order(self, *args: Any, **kwargs: Any) -> "FakeQuery":
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.bounds = (start, end)
+        return self
+
+    def execute(self) -> FakeResponse:
+        return self.db._execute(self)
+
+
+class FakeRPC(FakeQuery):
+    """`db.rpc(name, params)`; `table` holds the function name."""
+
+    def __init__(self, db: "FakeSupabase", name: str, params: Dict[str, Any]):
+        super().__init__(db, name)
+        self.op, self.payload = "rpc", params
+
+
+class FakeSupabase:
+    """Tables are {key: row} dicts; writes behave like PostgREST on Postgres.
+
+    `latency` makes every write take that long, and at most `capacity`
+    writes are served at once (the rest queue), so throughput stops growing
+    past `capacity` concurrent writers. `fail` can raise for chosen calls.
+    With `keep_rows=False` written rows are counted but not stored, for
+    measuring the sync's own memory.
+
+    `rpc("sync_groups", ...)` behaves like migrations/0003's function and is
+    logged in `rpcs` with its params.
+    """
+
+    KEYS = {"groups": "pco_group_id", "sync_state": "key"}
+
+    def __init__(self, latency: float = 0.0, capacity: int = 1_000_000, keep_rows: bool = True):
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.calls: List[tuple] = []
+        self.rpcs: List[tuple] = []
+        self.latency = latency
+        self.keep_rows = keep_rows
+        self.rows_written: dict[str, int] = {}
+        self.slots = threading.BoundedSemaphore(capacity)
+        self.lock = threading.Lock()
+        self.fail: Optional[Callable[[FakeQuery], Optional[BaseException]]] = None
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> FakeRPC:
+        return FakeRPC(self, name, params)
+
+    def _execute(self, query: FakeQuery) -> FakeResponse:
+        if query.op != "select" and self.latency:
+            with self.slots:
+                time.sleep(self.latency)
+        with self.lock:
+            if query.op == "rpc":
+                self.rpcs.append((query.table, query.payload))
+                size = len(query.payload.get("rows") or [])
+            else:
+                size = len(query.payload) if isinstance(query.payload, list) else None
+            self.calls.append((query.table, query.op, size))
+            if self.fail is not None:
+                error = self.fail(query)
+                if error is not None:
+                    raise error
+            return self._apply(query)
+
+    def _apply(self, query: FakeQuery) -> FakeResponse:
+        if query.op == "rpc":
+            return self._sync_groups(query)
+        table = self.tables.setdefault(query.table, {})
+        key = self.KEYS.get(query.table, "id")
+        matches = lambda row: all(f(row) for f in query.filters)
+
+        if query.op in ("insert", "upsert"):
+            rows = query.payload if isinstance(query.payload, list) else [query.payload]
+            keys = [row[key] for row in rows]
+            if query.op == "upsert" and len(set(keys)) != len(keys):
+                raise FakeAPIError("21000", "ON CONFLICT DO UPDATE command cannot affect row a second time")
+            if query.op == "insert" and (len(set(keys)) != len(keys) or any(k in table for k in keys)):
+                raise FakeAPIError("23505", "duplicate key value violates unique constraint")
+            self.rows_written[query.table] = self.rows_written.get(query.table, 0) + len(rows)
+            if not self.keep_rows:
+                return FakeResponse([])
+            for row in rows:
+                table.setdefault(row[key], {}).update(row)
+            return FakeResponse(rows)
+
+        if query.op == "update":
+            hit = [row for row in table.values() if matches(row)]
+            for row in hit:
+                row.update(query.payload)
+            return FakeResponse(hit)
+
+        if query.op == "delete":
+            gone = [k for k, row in table.items() if matches(row)]
+            removed = [table.pop(k) for k in gone]
+            return FakeResponse(removed)
+
+        rows = sorted((row for row in table.values() if matches(row)), key=lambda r: str(r.get(key)))
+        if query.bounds:
+            rows = rows[query.bounds[0]: query.bounds[1] + 1]
+        if query.columns:
+            rows = [{c: row.get(c) for c in query.columns} for row in rows]
+        return FakeResponse(rows)
+
+    def _sync_groups(self, query: FakeQuery) -> FakeResponse:
+        if query.table != "sync_groups":
+            raise FakeAPIError("PGRST202", f"Could not find the function public.{query.table}")
+        table = self.tables.setdefault("groups", {})
+        # The last copy of a repeated group wins, as with DISTINCT ON.
+        rows = {row["pco_group_id"]: row for row in query.payload.get("rows") or []}
+        for group_id, row in rows.items():
+            table.setdefault(group_id, {}).update(row, deleted_at=None)
+        self.rows_written["groups"] = self.rows_written.get("groups", 0) + len(rows)
+
+        deleted = 0
+        keep_ids = query.payload.get("keep_ids")
+        if keep_ids is not None:
+            keep = set(keep_ids)
+            for group_id, row in table.items():
+                if row.get("deleted_at") is None and group_id not in keep:
+                    row["deleted_at"] = datetime.now(timezone.utc).isoformat()
+                    deleted += 1
+        return FakeResponse({"upserted": len(rows), "deleted": deleted})
@@ -0,0 +1,54 @@
+import json
+import random
+
+import pytest
+
+import sync_groups
+from fakes import make_group
+
+# Request bodies as httpx encodes them: compact UTF-8 since 0.28, spaced and
+# ASCII-escaped before that.
+ENCODINGS = [
+    lambda batch: json.dumps(batch, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"),
+    lambda batch: json.dumps(batch, default=str).encode("utf-8"),
+]
+
+
+def random_row(rng: random.Random, i: int) -> dict:
+    text = "".join(rng.choice("abc é漢🎉\"\\\n") for _ in range(rng.choice([0, 10, 300, 3000])))
+    return {**sync_groups.transform_group(make_group(i, description=text)), "row_hash": "0" * 64}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batches_never_exceed_the_byte_cap(seed):
+    rng = random.Random(seed)
+    rows = [random_row(rng, i) for i in range(2000)]
+    batcher = sync_groups.AdaptiveBatcher(max_bytes=64 * 1024, initial_rows=50, max_rows=1000)
+
+    batches = []
+    for row in rows:
+        batch = batcher.add(row)
+        if batch:
+            batches.append(batch)
+            # Let the row target wander so the byte cap is what ends batches.
+            batcher.record(len(batch), rng.uniform(0.01, 1.0))
+    batches.append(batcher.flush())
+
+    assert [row for batch in batches for row in batch] == rows
+    for batch in batches:
+        for encode in ENCODINGS:
+            assert len(encode(batch)) <= batcher.max_bytes
+    # The cap is actually reached, not just the row target.
+    assert max(len(ENCODINGS[1](batch)) for batch in batches) > batcher.max_bytes * 0.9
+
+
+def test_oversized_row_is_sent_alone(capsys):
+    batcher = sync_groups.AdaptiveBatcher(max_bytes=1024, initial_rows=100)
+    small = sync_groups.transform_group(make_group(1))
+    huge = sync_groups.transform_group(make_group(2, description="x" * 5000))
+
+    assert batcher.add(small) is None
+    assert batcher.add(huge) == [small]
+    assert batcher.add(small) == [huge]
+    assert batcher.flush() == [small]
+    assert "over the 1024 byte batch cap" in capsys.readouterr().out
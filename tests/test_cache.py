@@ -0,0 +1,79 @@
+import os
+import re
+
+import sync_groups
+
+PAGES = 6  # 537 groups at 100 per page
+
+
+def cache_line(capsys):
+    out = capsys.readouterr().out
+    match = re.search(r"HTTP cache: (\d+) page\(s\) not modified, (\d+) bytes not re-downloaded", out)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def test_second_run_revalidates_every_page(make_pco, supabase, capsys):
+    server = make_pco(etags=True)
+    sync_groups.sync()
+    first_run_bytes = server.bytes_sent
+    assert cache_line(capsys) == (0, 0)
+
+    sync_groups.get_pco.cache_clear()
+    sync_groups.sync()
+
+    assert server.not_modified == PAGES
+    assert server.bytes_sent == first_run_bytes
+    assert cache_line(capsys) == (PAGES, first_run_bytes)
+    assert len(supabase.tables["groups"]) == 537
+
+
+def test_changed_page_is_downloaded_again(make_pco, supabase, capsys):
+    server = make_pco(etags=True)
+    sync_groups.sync()
+    server.groups[250]["attributes"]["name"] = "Renamed"
+    capsys.readouterr()
+
+    sync_groups.get_pco.cache_clear()
+    sync_groups.sync()
+
+    assert server.not_modified == PAGES - 1
+    assert cache_line(capsys)[0] == PAGES - 1
+    assert supabase.tables["groups"]["250"]["name"] == "Renamed"
+
+
+def test_no_cache_sends_plain_requests(make_pco, supabase, capsys):
+    server = make_pco(etags=True)
+    sync_groups.sync(use_cache=False)
+    sync_groups.get_pco.cache_clear()
+    sync_groups.sync(use_cache=False)
+
+    assert server.not_modified == 0
+    assert cache_line(capsys) is None
+    assert not os.path.exists(sync_groups.PCO_CACHE_DIR)
+
+
+def test_least_recently_used_entries_are_evicted(make_pco, tmp_path):
+    server = make_pco(etags=True)
+    pco = sync_groups.get_pco()
+
+    def url(offset):
+        return f"{server.groups_url}?per_page=100&offset={offset}"
+
+    # Room for two of the three pages.
+    size = max(len(pco.get_content(url(offset))) for offset in (0, 100, 200))
+    cache = pco.cache = sync_groups.ResponseCache(str(tmp_path / "cache"), max_bytes=int(size * 2.5))
+
+    pco.get_content(url(0))
+    pco.get_content(url(100))
+    # Backdate both so the order doesn't hang on the clock's resolution.
+    os.utime(cache._path(url(0)), (1_000, 1_000))
+    os.utime(cache._path(url(100)), (2_000, 2_000))
+
+    pco.get_content(url(0))  # a 304, which makes it the most recently used
+    pco.get_content(url(200))
+
+    assert cache.hits == 1
+    assert cache.load(url(0)) is not None
+    assert cache.load(url(100)) is None
+    assert cache.load(url(200)) is not None
+    assert cache.total_bytes <= cache.max_bytes
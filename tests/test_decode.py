@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import sync_groups
+from fakes import make_groups
+
+DECODERS = ["msgspec", "orjson", "json"]
+
+
+def use_decoder(monkeypatch, name):
+    """Make decode_page take the `name` path, as if only it were installed."""
+    if name != "json" and getattr(sync_groups, name) is None:
+        pytest.skip(f"{name} is not installed")
+    for module in ("msgspec", "orjson"):
+        if module != name:
+            monkeypatch.setattr(sync_groups, module, None)
+
+
+def page_body(groups):
+    return json.dumps({"data": groups, "included": [], "links": {}, "meta": {"count": len(groups)}}).encode()
+
+
+@pytest.mark.parametrize("decoder", DECODERS)
+def test_every_decoder_gives_the_same_rows(monkeypatch, decoder):
+    groups = make_groups(250)
+    use_decoder(monkeypatch, decoder)
+
+    page = sync_groups.decode_page(page_body(groups))
+
+    assert [g["id"] for g in page["data"]] == [g["id"] for g in groups]
+    assert [sync_groups.transform_group(g) for g in page["data"]] == [
+        sync_groups.transform_group(g) for g in groups
+    ]
+
+
+def test_sync_runs_on_the_stdlib_json_module(monkeypatch, pco, supabase):
+    monkeypatch.setattr(sync_groups, "msgspec", None)
+    monkeypatch.setattr(sync_groups, "orjson", None)
+
+    sync_groups.sync(use_cache=False, include_related=True, sparse_fields=True)
+
+    assert len(supabase.tables["groups"]) == len(pco.groups)
+    for group in pco.groups[:20]:
+        row = dict(supabase.tables["groups"][group["id"]])
+        row.pop("row_hash")
+        row.pop("deleted_at")
+        assert row == sync_groups.transform_group(group)
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import sync_groups
+from fakes import make_group
+
+
+def write_map(tmp_path, overrides):
+    path = tmp_path / "field_map.json"
+    path.write_text(json.dumps(overrides))
+    return str(path)
+
+
+def page(*groups):
+    return json.dumps({"data": list(groups), "included": [], "links": {}, "meta": {}}).encode()
+
+
+def test_attribute_names_need_not_be_identifiers(tmp_path):
+    field_map = sync_groups.load_field_map(write_map(tmp_path, {
+        "name": ["display-name", "name"],
+        "campus": ["class", "campus name"],
+    }))
+    sync_groups.set_field_map(field_map)
+
+    group = make_group(1, **{"display-name": "Shown", "class": "North", "campus name": "ignored"})
+    decoded = sync_groups.decode_page(page(group))
+    row = sync_groups.transform_group(decoded["data"][0])
+
+    assert row["name"] == "Shown"
+    assert row["campus"] == "North"
+    assert decoded["data"][0]["attributes"]["campus name"] == "ignored"
+    assert "display-name" in sync_groups.group_fieldset().split(",")
+
+
+def test_decoded_attributes_match_plain_json():
+    group = make_group(2, capacity=12)
+    decoded = sync_groups.decode_page(page(group))["data"][0]
+
+    assert sync_groups.transform_group(decoded) == sync_groups.transform_group(group)
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"nickname": ["name"]}, "unknown column"),
+    ({"name": []}, "needs a list"),
+    ({"name": [""]}, "needs a list"),
+    ({"name": ["first,last"]}, "comma"),
+])
+def test_bad_field_maps_are_rejected(tmp_path, overrides, message):
+    with pytest.raises(ValueError, match=message):
+        sync_groups.load_field_map(write_map(tmp_path, overrides))
+
+
+def test_zero_membership_count_is_kept(make_pco, supabase):
+    empty = make_group(1, memberships_count=0, enrollment=9)
+    unknown = make_group(2, memberships_count=None, enrollment=None)
+    server = make_pco([empty, unknown], memberships={"1": 7, "2": 3})
+
+    assert sync_groups.transform_group(empty)["current_size"] == 0
+    sync_groups.sync(use_cache=False, membership_counts=True)
+
+    assert supabase.tables["groups"]["1"]["current_size"] == 0
+    assert supabase.tables["groups"]["2"]["current_size"] == 3
+    lookups = [path.split("?")[0] for path in server.paths if "/memberships" in path]
+    assert lookups == ["/groups/v2/groups/2/memberships"]
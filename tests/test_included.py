@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+import sync_groups
+from fakes import make_group, make_resource
+
+GROUPS = 250
+TYPES = [make_resource("GroupType", str(i), f"Type {i}") for i in range(3)]
+LOCATIONS = [make_resource("Location", str(i), f"Campus {i}") for i in range(2)]
+TAGS = [make_resource("Tag", str(i), f"Tag {i}") for i in range(3)]
+
+
+def related_group(i):
+    group = make_group(i)
+    group["relationships"] = {
+        "group_type": {"data": {"type": "GroupType", "id": str(i % 3)}},
+        # Every fifth group has no location.
+        "location": {"data": None if i % 5 == 0 else {"type": "Location", "id": str(i % 2)}},
+        "tags": {"data": [{"type": "Tag", "id": str(t)} for t in range(i % 4)]},
+    }
+    return group
+
+
+@pytest.fixture
+def related_pco(make_pco):
+    return make_pco([related_group(i) for i in range(GROUPS)], included=TYPES + LOCATIONS + TAGS)
+
+
+@pytest.mark.parametrize("sparse_fields", [False, True])
+def test_group_type_campus_and_tags_come_from_included(related_pco, supabase, sparse_fields):
+    sync_groups.sync(use_cache=False, include_related=True, sparse_fields=sparse_fields)
+
+    rows = supabase.tables["groups"]
+    assert len(rows) == GROUPS
+    for i in range(GROUPS):
+        row = rows[str(i)]
+        assert row["group_type"] == f"Type {i % 3}"
+        assert row["campus"] == (None if i % 5 == 0 else f"Campus {i % 2}")
+        assert row["tags"] == {str(t): f"Tag {t}" for t in range(i % 4)}
+
+
+def test_campus_attribute_wins_over_location():
+    index = sync_groups.IncludedIndex()
+    index.add(LOCATIONS)
+    group = related_group(1)
+    group["attributes"]["campus_name"] = "Downtown"
+
+    row = sync_groups.transform_group(sync_groups.resolve_page([group], index)[0])
+
+    assert row["campus"] == "Downtown"
+
+
+def test_resources_repeated_across_pages_are_indexed_once(related_pco):
+    pages = list(sync_groups.iter_group_pages(params={"include": ",".join(sync_groups.INCLUDE_RELATED)}))
+    index = sync_groups.IncludedIndex()
+    for _data, included in pages:
+        index.add(included)
+
+    sent = sum(len(included) for _data, included in pages)
+    assert len(pages) > 1
+    assert sent == len(pages) * len(TYPES + LOCATIONS + TAGS)
+    assert len(index) == len(TYPES + LOCATIONS + TAGS)
+
+
+def test_msgspec_decoder_keeps_relationships_when_asked():
+    if sync_groups.msgspec is None:
+        pytest.skip("msgspec is not installed")
+    group = related_group(7)
+    body = json.dumps({"data": [group], "included": TAGS, "links": {}, "meta": {}}).encode()
+
+    with_relationships = sync_groups.decode_page(body, with_relationships=True)
+    without = sync_groups.decode_page(body)
+
+    assert with_relationships["data"][0]["relationships"] == group["relationships"]
+    assert with_relationships["included"] == TAGS
+    assert without["data"][0]["relationships"] == {}
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+
+import sync_groups
+
+SINCE = "where[updated_at][gte]"
+
+
+def watermark(supabase):
+    return supabase.tables["sync_state"][sync_groups.WATERMARK_KEY]["value"]
+
+
+def sent_since(server):
+    return [parse_qs(urlparse(path).query).get(SINCE, [None])[-1] for path in server.paths]
+
+
+def test_first_incremental_run_is_a_full_sync_that_saves_a_watermark(pco, supabase, capsys):
+    before = datetime.now(timezone.utc).replace(microsecond=0)
+    sync_groups.sync(incremental=True, use_cache=False)
+    after = datetime.now(timezone.utc)
+
+    assert "No watermark saved yet; running a full sync instead." in capsys.readouterr().out
+    assert set(sent_since(pco)) == {None}
+    assert len(supabase.tables["groups"]) == len(pco.groups)
+
+    saved = datetime.strptime(watermark(supabase), "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    assert before - sync_groups.WATERMARK_OVERLAP <= saved <= after - sync_groups.WATERMARK_OVERLAP
+
+
+def test_second_run_asks_only_for_groups_updated_since_the_watermark(pco, supabase):
+    sync_groups.sync(incremental=True, use_cache=False)
+    first = watermark(supabase)
+    pco.groups[5]["attributes"].update(name="Renamed", updated_at="2099-01-01T00:00:00Z")
+    pco.paths.clear()
+
+    sync_groups.sync(incremental=True, use_cache=False)
+
+    assert set(sent_since(pco)) == {first}
+    assert supabase.tables["groups"]["5"]["name"] == "Renamed"
+    upserts = [size for table, op, size in supabase.calls if table == "groups" and op == "upsert"]
+    assert upserts[-1] == 1
+    assert watermark(supabase) >= first
+
+
+def test_incremental_run_never_prunes(make_pco, supabase, capsys):
+    server = make_pco()
+    sync_groups.sync(incremental=True, use_cache=False)
+    # Most groups vanish from PCO, but an incremental pull can't tell a
+    # removed group from one that just didn't change.
+    server.groups = server.groups[:10]
+    server.groups[0]["attributes"].update(name="Renamed", updated_at="2099-01-01T00:00:00Z")
+    capsys.readouterr()
+
+    sync_groups.sync(incremental=True, use_cache=False)
+
+    assert "Tombstoning" not in capsys.readouterr().out
+    assert all(row["deleted_at"] is None for row in supabase.tables["groups"].values())
+    assert len(supabase.tables["groups"]) == 537
+    assert supabase.tables["groups"]["0"]["name"] == "Renamed"
+    assert not any(op == "update" for table, op, _size in supabase.calls if table == "groups")
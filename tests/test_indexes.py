@@ -0,0 +1,78 @@
+"""The finder's queries use the indexes from migrations/0004_finder_indexes.sql.
+
+Needs SUPABASE_DB_URL pointing at a scratch database (see the pg fixture);
+skipped otherwise.
+"""
+
+import contextlib
+import io
+import json
+
+import pytest
+
+import sync_groups
+from fakes import make_group
+
+ROWS = 20_000
+CAMPUSES = [f"Campus {i}" for i in range(40)]
+STAGES = [f"Stage {i}" for i in range(25)]
+TYPES = [f"Type {i}" for i in range(30)]
+
+
+def finder_row(i):
+    row = sync_groups.transform_group(make_group(
+        i,
+        campus_name=CAMPUSES[i % len(CAMPUSES)],
+        life_stage=STAGES[i % len(STAGES)],
+        group_type=TYPES[i % len(TYPES)],
+        # One group in a hundred meets on a Saturday.
+        meeting_day="Saturday" if i % 100 == 0 else ["Monday", "Tuesday", "Wednesday"][i % 3],
+    ))
+    row["tags"] = {"childcare": True} if i % 100 == 1 else {}
+    row["row_hash"] = sync_groups.compute_row_hash(row)
+    row["deleted_at"] = None
+    return row
+
+
+@pytest.fixture
+def finder_db(pg):
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync_groups.copy_rows((finder_row(i) for i in range(ROWS)), upsert=False)
+    with pg.cursor() as cur:
+        cur.execute("analyze public.groups")
+    return pg
+
+
+def indexes_used(pg, where, params):
+    with pg.cursor() as cur:
+        cur.execute(f"explain (format json) select * from public.groups where {where}", params)
+        plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    names = set()
+
+    def walk(node):
+        if "Index Name" in node:
+            names.add(node["Index Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return names
+
+
+@pytest.mark.parametrize("where, params, index", [
+    ("campus = %s", [CAMPUSES[3]], "groups_campus_idx"),
+    ("stage_of_life = %s", [STAGES[3]], "groups_stage_of_life_idx"),
+    ("group_type = %s", [TYPES[3]], "groups_group_type_idx"),
+    ("days_of_week @> %s", [["Saturday"]], "groups_days_of_week_idx"),
+    ("tags @> %s::jsonb", ['{"childcare": true}'], "groups_tags_idx"),
+    (
+        "is_open and deleted_at is null and campus = %s and stage_of_life = %s and group_type = %s",
+        [CAMPUSES[1], STAGES[1], TYPES[1]],
+        "groups_campus_stage_of_life_group_type_idx",
+    ),
+])
+def test_finder_query_uses_index(finder_db, where, params, index):
+    assert index in indexes_used(finder_db, where, params)
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+import sync_groups
+from fakes import make_group, make_groups
+
+
+def group_ids(pages):
+    return [g["id"] for data, _included in pages for g in data]
+
+
+@pytest.mark.parametrize("concurrency", [1, 3, 8])
+def test_same_rows_in_the_same_order_at_every_concurrency(pco, concurrency):
+    expected = [g["id"] for g in sorted(
+        pco.groups, key=lambda g: (g["attributes"]["created_at"], int(g["id"])))]
+
+    groups, _index = sync_groups.fetch_all_groups(concurrency=concurrency)
+
+    assert [g["id"] for g in groups] == expected
+    assert [sync_groups.transform_group(g) for g in groups] == [
+        sync_groups.transform_group(g) for g in sorted(pco.groups, key=lambda g: expected.index(g["id"]))
+    ]
+
+
+def test_every_request_sends_the_same_order(pco):
+    list(sync_groups.iter_group_pages(concurrency=4))
+    assert pco.paths
+    assert all(f"order={sync_groups.PAGE_ORDER}" in path for path in pco.paths)
+
+
+def test_group_created_mid_pull_does_not_shift_pages(make_pco):
+    server = make_pco(make_groups(537))
+
+    def add_group(server, path):
+        if server.requests == 2:
+            server.groups.insert(0, make_group(9999, created_at="2030-01-01T00:00:00Z"))
+
+    server.on_request = add_group
+    ids = group_ids(sync_groups.iter_group_pages(concurrency=3))
+
+    assert len(ids) == len(set(ids))
+    assert set(ids) >= {str(i) for i in range(537)}
+
+
+def test_repeated_group_is_written_once(make_pco, supabase, capsys):
+    # A group that sorts first appearing mid-pull pushes every later page
+    # along by one, so the last group of each page comes back again.
+    server = make_pco(make_groups(537))
+    added = threading.Lock()
+
+    def add_group(server, path):
+        # Before any page after the first is built, so every one of them sees
+        # the shift (a page built earlier would skip a group instead).
+        if "offset=" in path:
+            with added:
+                if not any(g["id"] == "9999" for g in server.groups):
+                    server.groups.append(make_group(9999, created_at="2000-01-01T00:00:00Z"))
+
+    server.on_request = add_group
+    sync_groups.sync(concurrency=3, use_cache=False)
+
+    assert "duplicate(s) skipped" in capsys.readouterr().out
+    upserts = [size for table, op, size in supabase.calls if table == "groups" and op == "upsert"]
+    assert sum(upserts) == len(supabase.tables["groups"])
+    assert {str(i) for i in range(537)} <= set(supabase.tables["groups"])
+
+
+def test_row_diff_drops_repeats():
+    diff = sync_groups.RowDiff()
+    rows = [sync_groups.transform_group(g) for g in make_groups(3)]
+    again = [sync_groups.transform_group(g) for g in make_groups(2, start=1)]
+
+    assert len(diff.filter(rows)) == 3
+    assert diff.filter(again) == []
+    assert diff.duplicates == 2
+    assert diff.added == 3
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import sync_groups
+from fakes import make_groups
+
+LIMIT = 10
+PERIOD = 0.5
+
+
+@pytest.fixture
+def throttling_pco(make_pco, monkeypatch):
+    """A PCO stub allowing LIMIT requests per PERIOD, with 10 groups a page."""
+    monkeypatch.setattr(sync_groups, "PER_PAGE", 10)
+    return make_pco(make_groups(300), rate_limit=LIMIT, rate_period=PERIOD)
+
+
+def test_limiter_never_allows_more_than_limit_per_window():
+    limiter = sync_groups.RateLimiter(5, 0.2)
+    spans = []
+
+    def request(_):
+        with limiter:
+            started = time.monotonic()
+            time.sleep(0.01)
+            spans.append((started, time.monotonic()))
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(request, range(20)))
+
+    spans.sort()
+    # A request may only start a full period after the fifth-last one ended.
+    ends = sorted(end for _start, end in spans)
+    for i, (start, _end) in enumerate(spans[5:]):
+        assert start >= ends[i] + 0.2 - 1e-3
+
+
+def test_first_requests_are_not_delayed():
+    limiter = sync_groups.RateLimiter(5, 10.0)
+    started = time.monotonic()
+    for _ in range(5):
+        with limiter:
+            pass
+    assert time.monotonic() - started < 0.1
+
+
+def test_pull_stays_under_the_limit(throttling_pco):
+    groups, _ = sync_groups.fetch_all_groups(concurrency=4)
+
+    assert len(groups) == 300
+    assert throttling_pco.throttled == 0
+    assert throttling_pco.max_in_window <= LIMIT
+
+
+def test_requests_made_elsewhere_count_against_the_window(throttling_pco):
+    # Another job using the same app just spent most of the window.
+    throttling_pco.preload_window(LIMIT - 2)
+    groups, _ = sync_groups.fetch_all_groups(concurrency=4)
+
+    assert len(groups) == 300
+    assert throttling_pco.throttled == 0
+
+
+def test_429_waits_for_retry_after(throttling_pco, capsys):
+    throttling_pco.preload_window(LIMIT)
+    started = time.monotonic()
+    groups, _ = sync_groups.fetch_all_groups(concurrency=1)
+
+    assert len(groups) == 300
+    assert throttling_pco.throttled == 1
+    assert "PCO rate limit hit" in capsys.readouterr().out
+    assert time.monotonic() - started >= PERIOD
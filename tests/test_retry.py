@@ -0,0 +1,73 @@
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+import sync_groups
+from fakes import make_groups
+
+
+def rows(n=10):
+    return [sync_groups.transform_group(g) for g in make_groups(n)]
+
+
+def fail_first(error):
+    """A FakeSupabase.fail hook: apply the first write, then raise `error`."""
+    state = {"failed": False}
+
+    def fail(query):
+        if query.op in ("insert", "upsert") and not state["failed"]:
+            state["failed"] = True
+            query.db._apply(query)  # the write committed; only the answer was lost
+            return error
+        return None
+
+    return fail
+
+
+def test_upsert_is_retried_after_a_timeout(supabase):
+    supabase.fail = fail_first(httpx.ReadTimeout("timed out"))
+
+    assert sync_groups.write_rows(rows(), upsert=True) == 10
+    assert [op for _table, op, _size in supabase.calls] == ["upsert", "upsert"]
+
+
+def test_insert_is_not_retried_after_a_timeout(supabase):
+    supabase.fail = fail_first(httpx.ReadTimeout("timed out"))
+
+    with pytest.raises(RuntimeError, match="1 batch"):
+        sync_groups.write_rows(rows(), upsert=False)
+    # One attempt only: a retry would hit 23505 on the rows it already wrote.
+    assert [op for _table, op, _size in supabase.calls] == ["insert"]
+    assert len(supabase.tables["groups"]) == 10
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("connection refused"),
+    APIError({"code": "40001", "message": "could not serialize access"}),
+])
+def test_insert_is_retried_when_it_was_not_applied(supabase, error):
+    calls = []
+
+    def fail(query):
+        calls.append(query.op)
+        return error if len(calls) == 1 else None
+
+    supabase.fail = fail
+
+    assert sync_groups.write_rows(rows(), upsert=False) == 10
+    assert calls == ["insert", "insert"]
+
+
+@pytest.mark.parametrize("exc, idempotent, expected", [
+    (httpx.ReadTimeout("timed out"), True, True),
+    (httpx.ReadTimeout("timed out"), False, False),
+    (httpx.RemoteProtocolError("reset"), False, False),
+    (httpx.ConnectTimeout("timed out"), False, True),
+    (APIError({"code": "57014"}), False, True),
+    (APIError({"code": "08006"}), True, True),
+    (APIError({"code": "08006"}), False, False),
+    (APIError({"code": "502"}), False, False),
+    (APIError({"code": "23505"}), True, False),
+])
+def test_is_retryable(exc, idempotent, expected):
+    assert sync_groups.is_retryable(exc, idempotent) is expected
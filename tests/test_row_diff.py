@@ -0,0 +1,46 @@
+import sync_groups
+from fakes import make_group
+
+
+def group_writes(supabase):
+    return sum(size for table, op, size in supabase.calls if table == "groups" and op == "upsert")
+
+
+def row_changes(capsys):
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith("Row changes: ")]
+    return lines[-1][len("Row changes: "):]
+
+
+def test_unchanged_resync_writes_nothing(pco, supabase, capsys):
+    sync_groups.sync(use_cache=False)
+    assert group_writes(supabase) == 537
+    assert row_changes(capsys) == "537 added, 0 revived, 0 changed, 0 unchanged, 0 removed"
+
+    sync_groups.sync(use_cache=False)
+
+    assert group_writes(supabase) == 537
+    assert row_changes(capsys) == "0 added, 0 revived, 0 changed, 537 unchanged, 0 removed"
+
+
+def test_one_edited_group_writes_one_row(pco, supabase, capsys):
+    sync_groups.sync(use_cache=False)
+    pco.groups[42]["attributes"]["name"] = "Renamed"
+    capsys.readouterr()
+
+    sync_groups.sync(use_cache=False)
+
+    assert group_writes(supabase) == 537 + 1
+    assert supabase.tables["groups"]["42"]["name"] == "Renamed"
+    assert row_changes(capsys) == "0 added, 0 revived, 1 changed, 536 unchanged, 0 removed"
+
+
+def test_added_and_removed_groups_are_counted(pco, supabase, capsys):
+    sync_groups.sync(use_cache=False)
+    pco.groups = pco.groups[1:] + [make_group(1000)]
+    capsys.readouterr()
+
+    sync_groups.sync(use_cache=False)
+
+    assert group_writes(supabase) == 537 + 1
+    assert supabase.tables["groups"]["0"]["deleted_at"] is not None
+    assert row_changes(capsys) == "1 added, 0 revived, 0 changed, 536 unchanged, 1 removed"
@@ -0,0 +1,87 @@
+"""--rpc: the Python side against FakeSupabase, and public.sync_groups itself
+against a real Postgres (SUPABASE_DB_URL; skipped without it)."""
+
+import sync_groups
+from fakes import make_group
+
+
+def sync_groups_calls(supabase):
+    return [params for name, params in supabase.rpcs if name == "sync_groups"]
+
+
+def test_full_rpc_run_sends_changed_rows_and_every_id_to_keep(make_pco, supabase):
+    server = make_pco()
+    sync_groups.sync(rpc=True, use_cache=False)
+    server.groups = server.groups[:500]
+    server.groups[0]["attributes"]["name"] = "Renamed"
+
+    sync_groups.sync(rpc=True, use_cache=False)
+
+    first, second = sync_groups_calls(supabase)
+    assert len(first["rows"]) == 537
+    assert first["keep_ids"] == sorted(str(i) for i in range(537))
+    assert [row["pco_group_id"] for row in second["rows"]] == ["0"]
+    assert second["keep_ids"] == sorted(str(i) for i in range(500))
+    groups = supabase.tables["groups"]
+    assert sum(row["deleted_at"] is not None for row in groups.values()) == 37
+    assert groups["0"]["name"] == "Renamed"
+
+
+def test_incremental_rpc_run_never_prunes(make_pco, supabase):
+    server = make_pco()
+    sync_groups.sync(rpc=True, incremental=True, use_cache=False)
+    server.groups = server.groups[:10]
+    server.groups[0]["attributes"].update(name="Renamed", updated_at="2099-01-01T00:00:00Z")
+
+    sync_groups.sync(rpc=True, incremental=True, use_cache=False)
+
+    first, second = sync_groups_calls(supabase)
+    # The first run had no watermark, so it was a full one.
+    assert first["keep_ids"] is not None
+    assert second["keep_ids"] is None
+    assert [row["pco_group_id"] for row in second["rows"]] == ["0"]
+    assert all(row["deleted_at"] is None for row in supabase.tables["groups"].values())
+
+
+def call(pg, rows, keep_ids=None):
+    from psycopg.types.json import Jsonb
+
+    with pg.cursor() as cur:
+        cur.execute("select public.sync_groups(%s, %s)", (Jsonb(rows), keep_ids))
+        return cur.fetchone()[0]
+
+
+def stored(pg):
+    with pg.cursor() as cur:
+        cur.execute("select pco_group_id, name, deleted_at is not null from public.groups")
+        return {group_id: (name, tombstoned) for group_id, name, tombstoned in cur.fetchall()}
+
+
+def rows(ids, **attributes):
+    return [sync_groups.transform_group(make_group(i, **attributes)) for i in ids]
+
+
+def test_sync_groups_function_keeps_the_last_copy_of_a_group(pg):
+    with pg.cursor() as cur:
+        cur.execute("truncate public.groups")
+
+    result = call(pg, rows([1, 2]) + rows([1], name="Second copy"))
+
+    assert result == {"upserted": 2, "deleted": 0}
+    assert stored(pg) == {"1": ("Second copy", False), "2": ("Group 2", False)}
+
+
+def test_sync_groups_function_tombstones_groups_not_kept(pg):
+    with pg.cursor() as cur:
+        cur.execute("truncate public.groups")
+    call(pg, rows(range(5)))
+
+    assert call(pg, [], keep_ids=["0", "1"]) == {"upserted": 0, "deleted": 3}
+    # Already tombstoned groups aren't counted again.
+    assert call(pg, [], keep_ids=["0", "1"]) == {"upserted": 0, "deleted": 0}
+    assert {k: v[1] for k, v in stored(pg).items()} == {
+        "0": False, "1": False, "2": True, "3": True, "4": True}
+
+    # Upserting a tombstoned group revives it.
+    call(pg, rows([3], name="Back"), keep_ids=["0", "1", "3"])
+    assert stored(pg)["3"] == ("Back", False)
@@ -0,0 +1,91 @@
+"""Tombstones: groups missing from PCO get deleted_at, come back when PCO
+returns them, and are purged after --purge-tombstones DAYS."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import sync_groups
+
+
+def days_ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+def test_missing_group_is_tombstoned_once(make_pco, supabase):
+    server = make_pco()
+    sync_groups.sync(use_cache=False)
+    server.groups = server.groups[1:]
+
+    sync_groups.sync(use_cache=False)
+    tombstone = supabase.tables["groups"]["0"]["deleted_at"]
+    sync_groups.sync(use_cache=False)
+
+    assert tombstone is not None
+    # A later run leaves the date alone, so the purge clock keeps running.
+    assert supabase.tables["groups"]["0"]["deleted_at"] == tombstone
+    live = [row for row in supabase.tables["groups"].values() if row["deleted_at"] is None]
+    assert len(live) == 536
+
+
+def test_group_back_in_pco_is_revived(make_pco, supabase, capsys):
+    server = make_pco()
+    sync_groups.sync(use_cache=False)
+    removed = server.groups.pop(3)
+    sync_groups.sync(use_cache=False)
+    server.groups.append(removed)
+    capsys.readouterr()
+
+    sync_groups.sync(use_cache=False)
+
+    assert supabase.tables["groups"]["3"]["deleted_at"] is None
+    assert "0 added, 1 revived, 0 changed, 536 unchanged, 0 removed" in capsys.readouterr().out
+
+
+def test_purge_only_deletes_tombstones_past_the_cutoff(pco, supabase):
+    sync_groups.sync(use_cache=False)
+    groups = supabase.tables["groups"]
+    groups["1"]["deleted_at"] = days_ago(45)
+    groups["2"]["deleted_at"] = days_ago(29)
+
+    assert sync_groups.purge_tombstones(30) == 1
+
+    assert "1" not in groups
+    assert groups["2"]["deleted_at"] is not None
+    assert len(groups) == 536
+
+
+def test_sync_purges_after_writing(make_pco, supabase):
+    server = make_pco()
+    sync_groups.sync(use_cache=False)
+    supabase.tables["groups"]["1"]["deleted_at"] = days_ago(45)
+    server.groups = [g for g in server.groups if g["id"] != "1"]
+
+    sync_groups.sync(use_cache=False, purge_tombstones_days=30)
+
+    assert "1" not in supabase.tables["groups"]
+    assert len(supabase.tables["groups"]) == 536
+
+
+@pytest.fixture
+def reader(pg):
+    """A role with plain SELECT on public.groups, like PostgREST's anon."""
+    with pg.cursor() as cur:
+        cur.execute("drop role if exists sync_test_reader")
+        cur.execute("create role sync_test_reader")
+        cur.execute("grant select on public.groups to sync_test_reader")
+    yield pg
+    with pg.cursor() as cur:
+        cur.execute("reset role")
+        cur.execute("revoke select on public.groups from sync_test_reader")
+        cur.execute("drop role sync_test_reader")
+
+
+def test_readers_do_not_see_tombstones(reader):
+    with reader.cursor() as cur:
+        cur.execute("truncate public.groups")
+        cur.execute("insert into public.groups (pco_group_id, name, deleted_at) "
+                    "values ('live', 'Live', null), ('gone', 'Gone', now())")
+        cur.execute("set role sync_test_reader")
+        cur.execute("select pco_group_id from public.groups")
+        assert [row[0] for row in cur.fetchall()] == ["live"]
@@ -0,0 +1,102 @@
+"""--swap against a real Postgres: what the shadow table has to keep.
+
+Needs SUPABASE_DB_URL pointing at a scratch database (see the pg fixture);
+skipped otherwise.
+"""
+
+import contextlib
+import io
+
+import pytest
+
+import sync_groups
+from fakes import make_group
+
+POLICY = "groups_swap_test_read"
+
+
+def rows(ids, **attributes):
+    return [sync_groups.transform_group(make_group(i, **attributes)) for i in ids]
+
+
+def indexes(pg):
+    with pg.cursor() as cur:
+        cur.execute("select indexname, indexdef from pg_indexes "
+                    "where schemaname = 'public' and tablename = 'groups'")
+        return dict(cur.fetchall())
+
+
+def access(pg):
+    with pg.cursor() as cur:
+        cur.execute("select relrowsecurity, relacl::text from pg_class where oid = 'public.groups'::regclass")
+        security = cur.fetchone()
+        cur.execute("select policyname, cmd, roles::text, qual from pg_policies "
+                    "where schemaname = 'public' and tablename = 'groups'")
+        return security, sorted(cur.fetchall())
+
+
+@pytest.fixture
+def swap_db(pg):
+    with pg.cursor() as cur:
+        cur.execute("truncate public.groups restart identity")
+        cur.execute(f"drop policy if exists {POLICY} on public.groups")
+        cur.execute(f"create policy {POLICY} on public.groups for select to public using (is_open)")
+        cur.execute("grant select on public.groups to public")
+    yield pg
+    with pg.cursor() as cur:
+        cur.execute(f"drop policy if exists {POLICY} on public.groups")
+        cur.execute("revoke select on public.groups from public")
+
+
+def swap(batch):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return sync_groups.swap_rows(batch)
+
+
+def test_swapping_twice_keeps_indexes_access_and_the_id_sequence(swap_db):
+    pg = swap_db
+    before_indexes, before_access = indexes(pg), access(pg)
+    assert {"groups_read_live", POLICY} <= {policy[0] for policy in before_access[1]}
+    with pg.cursor() as cur:
+        cur.execute("select pg_get_serial_sequence('public.groups', 'id')")
+        sequence = cur.fetchone()[0]
+
+    swap(rows(range(300)))
+    swap(rows(range(250), name="Renamed"))
+
+    assert indexes(pg) == before_indexes
+    assert access(pg) == before_access
+    with pg.cursor() as cur:
+        cur.execute("select to_regclass('public.groups_next')")
+        assert cur.fetchone()[0] is None
+        # The sequence now belongs to the swapped-in table and survived the
+        # old one's drop; new ids carry on from where the loads left off.
+        cur.execute("select pg_get_serial_sequence('public.groups', 'id')")
+        assert cur.fetchone()[0] == sequence
+        cur.execute("select max(id) from public.groups")
+        highest = cur.fetchone()[0]
+        cur.execute("insert into public.groups (pco_group_id, name) values ('new', 'New') returning id")
+        assert cur.fetchone()[0] > highest
+
+
+def test_groups_missing_from_the_swap_come_back_tombstoned(swap_db):
+    pg = swap_db
+    swap(rows(range(300)))
+    swap(rows(range(250), name="Renamed"))
+
+    with pg.cursor() as cur:
+        cur.execute("select pco_group_id, name, deleted_at is not null from public.groups")
+        groups = {group_id: (name, tombstoned) for group_id, name, tombstoned in cur.fetchall()}
+
+    assert len(groups) == 300
+    assert all(groups[str(i)] == ("Renamed", False) for i in range(250))
+    assert all(groups[str(i)] == (f"Group {i}", True) for i in range(250, 300))
+
+
+def test_swap_refuses_an_empty_load(swap_db):
+    swap(rows(range(10)))
+    with pytest.raises(RuntimeError, match="empty table"):
+        swap([])
+    with swap_db.cursor() as cur:
+        cur.execute("select count(*) from public.groups where deleted_at is null")
+        assert cur.fetchone()[0] == 10